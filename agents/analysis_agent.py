@@ -5,18 +5,13 @@ from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import numpy as np
 from enum import Enum
-import logging
+from utils.logging_setup import setup_logging, get_sampled_logger, summarize
+from utils.admission import add_admission_control
+from utils.metrics import instrument_app, track_stage
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.FileHandler("analysis_agent.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("analysis_agent")
+logger = setup_logging("analysis_agent")
+health_logger = get_sampled_logger("analysis_agent.health")
 
 app = FastAPI(
     title="Analysis Agent",
@@ -33,6 +28,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+add_admission_control(app)
+instrument_app(app, "analysis")
+
 class MarketSentiment(str, Enum):
     BULLISH = "bullish"
     BEARISH = "bearish"
@@ -79,10 +77,10 @@ class FinancialAnalyzer:
                 'total_value': total_value,
                 'sector_allocation': sector_allocation
             }
-            logger.info(f"Calculated portfolio metrics: {result}")
+            logger.info("Calculated portfolio metrics: %s", summarize(result))
             return result
         except Exception as e:
-            logger.error(f"Error calculating portfolio metrics: {e}")
+            logger.error("Error calculating portfolio metrics: %s", e)
             raise ValueError(f"Error calculating portfolio metrics: {str(e)}")
 
     def analyze_earnings_surprises(self, earnings_data: List[Dict]) -> Dict:
@@ -99,10 +97,10 @@ class FinancialAnalyzer:
                 'negative_surprises': negative_surprises,
                 'average_surprise': avg_surprise
             }
-            logger.info(f"Earnings analysis: {result}")
+            logger.info("Earnings analysis: %s", summarize(result))
             return result
         except Exception as e:
-            logger.error(f"Error analyzing earnings surprises: {e}")
+            logger.error("Error analyzing earnings surprises: %s", e)
             raise ValueError(f"Error analyzing earnings surprises: {str(e)}")
 
     def determine_market_sentiment(self, sentiment_data: Dict) -> MarketSentiment:
@@ -117,7 +115,7 @@ class FinancialAnalyzer:
                     try:
                         change = float(change.strip('%'))
                     except Exception as e:
-                        logger.warning(f"Could not parse change value: {change} ({e})")
+                        logger.warning("Could not parse change value: %s (%s)", change, e)
                         continue
                 if change > 0:
                     positive_signals += 1
@@ -138,7 +136,7 @@ class FinancialAnalyzer:
             else:
                 return MarketSentiment.NEUTRAL
         except Exception as e:
-            logger.error(f"Error determining market sentiment: {e}")
+            logger.error("Error determining market sentiment: %s", e)
             raise ValueError(f"Error determining market sentiment: {str(e)}")
 
 analyzer = FinancialAnalyzer()
@@ -149,9 +147,12 @@ async def analyze_data(request: AnalysisRequest):
     logger.info("/analyze called.")
     try:
         # Perform various analyses
-        portfolio_metrics = analyzer.calculate_portfolio_metrics(request.portfolio_data)
-        earnings_analysis = analyzer.analyze_earnings_surprises(request.earnings_data)
-        market_sentiment = analyzer.determine_market_sentiment(request.sentiment_data)
+        with track_stage("analysis.portfolio_metrics"):
+            portfolio_metrics = analyzer.calculate_portfolio_metrics(request.portfolio_data)
+        with track_stage("analysis.earnings"):
+            earnings_analysis = analyzer.analyze_earnings_surprises(request.earnings_data)
+        with track_stage("analysis.sentiment"):
+            market_sentiment = analyzer.determine_market_sentiment(request.sentiment_data)
         
         result = {
             "portfolio_metrics": portfolio_metrics,
@@ -159,14 +160,14 @@ async def analyze_data(request: AnalysisRequest):
             "market_sentiment": market_sentiment,
             "timestamp": datetime.now().isoformat()
         }
-        logger.info(f"Analysis result: {result}")
+        logger.info("Analysis result: %s", summarize(result))
         return result
     except Exception as e:
-        logger.error(f"Error in /analyze: {e}")
+        logger.error("Error in /analyze: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health", tags=["Utility"])
 async def health_check():
     """Health check endpoint."""
-    logger.info("Health check called.")
+    health_logger.info("Health check called.")
     return {"status": "healthy"}
\ No newline at end of file
@@ -1,20 +1,27 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict
-import logging
+from typing import List, Dict, Optional, Union
+from datetime import date, timedelta
+from functools import partial
+from data_ingestion import api_fetcher, price_store
 from data_ingestion.api_fetcher import MarketDataFetcher
+from data_ingestion.quote_hub import QuoteHub, QuoteSubscriber
+from utils.lazy import ensure_loaded
+from utils.logging_setup import setup_logging, get_sampled_logger, summarize
+from utils.admission import add_admission_control
+from utils.metrics import instrument_app
+from utils.rate_limit import UpstreamThrottled, throttled_error
+from utils.scheduler import PrewarmConfig, PrewarmScheduler, cache_refresh_job
+from utils.warmup import add_warmup
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.FileHandler("api_agent.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("api_agent")
+logger = setup_logging("api_agent")
+health_logger = get_sampled_logger("api_agent.health")
 
 app = FastAPI(
     title="API Agent",
@@ -31,51 +38,259 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+add_admission_control(app)
+instrument_app(app, "api")
+
 market_data_fetcher = MarketDataFetcher()
 
+# /ws/quotes subscribers share one poller per symbol; each poll also refreshes the quote cache
+quote_hub = QuoteHub(
+    partial(market_data_fetcher.get_stock_data, refresh=True),
+    interval=float(os.getenv("QUOTE_POLL_SECONDS", 5))
+)
+MAX_SUBSCRIBED_SYMBOLS = int(os.getenv("QUOTE_MAX_SYMBOLS", 50))
+
+# Refresh quotes and earnings for the watchlist shortly before the morning brief
+prewarm_scheduler = PrewarmScheduler("api_agent", PrewarmConfig.from_env())
+for _symbol in prewarm_scheduler.config.watchlist:
+    prewarm_scheduler.add_job("quotes", _symbol, partial(market_data_fetcher.get_stock_data, _symbol, refresh=True))
+    # get_earnings_surprises skips symbols it failed to fetch, so check the cache was written
+    prewarm_scheduler.add_job("earnings", _symbol, cache_refresh_job(
+        market_data_fetcher.cache, [('earnings', _symbol)],
+        partial(market_data_fetcher.get_earnings_surprises, [_symbol], refresh=True)))
+
+@app.on_event("startup")
+async def start_prewarm():
+    if prewarm_scheduler.config.enabled:
+        prewarm_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_prewarm():
+    await prewarm_scheduler.stop()
+    await quote_hub.stop()
+
+add_warmup(app, logger, {
+    "yfinance": lambda: ensure_loaded(api_fetcher.yf),
+    "pandas": lambda: ensure_loaded(price_store.pd),
+})
+
 class Portfolio(BaseModel):
     positions: List[Dict]
 
 class SymbolList(BaseModel):
     symbols: List[str]
 
+class ExposureRequest(BaseModel):
+    positions: Optional[List[Dict]] = None
+    region: Optional[Union[str, List[str]]] = None
+    sector: Optional[Union[str, List[str]]] = None
+    currency: Optional[Union[str, List[str]]] = None
+    as_of: Optional[date] = None
+    # Only the book-of-record caller should persist; what-if requests must not overwrite history
+    snapshot: bool = False
+
+class ReturnsRequest(BaseModel):
+    symbols: List[str]
+    start: Optional[date] = None
+    end: Optional[date] = None
+    log: bool = False
+
+def _default_range(start: Optional[date], end: Optional[date]) -> (date, date):
+    """Default to the trailing year ending today."""
+    end = end or date.today()
+    return start or end - timedelta(days=365), end
+
 @app.get("/health", tags=["Utility"])
 async def health_check():
     """Health check endpoint."""
-    logger.info("Health check called.")
+    health_logger.info("Health check called.")
     return {"status": "healthy"}
 
+@app.get("/prewarm/status", tags=["Utility"])
+async def get_prewarm_status():
+    """Freshness of pre-warmed datasets (warm, stale or cold)."""
+    return prewarm_scheduler.status()
+
+@app.post("/prewarm/run", tags=["Utility"])
+async def run_prewarm():
+    """Refresh every pre-warmed dataset immediately, without jitter."""
+    await prewarm_scheduler.run_once(jitter=0)
+    return prewarm_scheduler.status()
+
 @app.post("/asia-tech-exposure", tags=["Portfolio"])
 async def get_asia_tech_exposure(portfolio: Portfolio):
     """Calculate Asia tech exposure from portfolio positions."""
-    logger.info(f"/asia-tech-exposure called with positions: {portfolio.positions}")
+    logger.info("/asia-tech-exposure called with positions: %s", summarize(portfolio.positions))
     try:
         exposure = market_data_fetcher.get_asia_tech_exposure(portfolio.positions)
-        logger.info(f"Exposure result: {exposure}")
+        logger.info("Exposure result: %s", summarize(exposure))
         return exposure
     except Exception as e:
-        logger.error(f"Error in /asia-tech-exposure: {e}")
+        logger.error("Error in /asia-tech-exposure: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/exposure", tags=["Portfolio"])
+async def get_exposure(request: ExposureRequest):
+    """
+    Exposure of any region/sector/currency slice with day-over-day and week-over-week deltas.
+    With positions, the day's cube is built (and stored only with snapshot=true); without,
+    the stored snapshot for as_of is queried.
+    """
+    logger.info("/exposure called for region=%s sector=%s currency=%s as_of=%s.",
+                request.region, request.sector, request.currency, request.as_of)
+    try:
+        return market_data_fetcher.get_exposure(
+            request.positions, as_of=request.as_of, snapshot=request.snapshot,
+            region=request.region, sector=request.sector, currency=request.currency
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        logger.error("Error in /exposure: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/exposure/snapshots", tags=["Portfolio"])
+async def list_exposure_snapshots():
+    """Dates with a stored exposure cube snapshot."""
+    return {"dates": [d.isoformat() for d in market_data_fetcher.exposure_store.snapshot_dates()]}
+
 @app.post("/earnings-surprises", tags=["Earnings"])
 async def get_earnings_surprises(symbols: SymbolList):
     """Get earnings surprises for a list of symbols."""
-    logger.info(f"/earnings-surprises called with symbols: {symbols.symbols}")
+    logger.info("/earnings-surprises called with symbols: %s", summarize(symbols.symbols))
     try:
-        surprises = market_data_fetcher.get_earnings_surprises(symbols.symbols)
-        logger.info(f"Earnings surprises: {surprises}")
+        surprises = await asyncio.to_thread(market_data_fetcher.get_earnings_surprises, symbols.symbols)
+        logger.info("Earnings surprises: %s", summarize(surprises))
         return {"surprises": surprises}
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
     except Exception as e:
-        logger.error(f"Error in /earnings-surprises: {e}")
+        logger.error("Error in /earnings-surprises: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/stock/{symbol}", tags=["Stock"])
 async def get_stock_data(symbol: str):
     """Fetch current stock data for a given symbol."""
-    logger.info(f"/stock/{symbol} called.")
-    data = market_data_fetcher.get_stock_data(symbol)
+    logger.info("/stock/%s called.", symbol)
+    try:
+        # Upstream I/O and rate-limit waits block, so keep them off the event loop
+        data = await asyncio.to_thread(market_data_fetcher.get_stock_data, symbol)
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
     if data is None:
-        logger.warning(f"Data not found for symbol {symbol}")
+        logger.warning("Data not found for symbol %s", symbol)
         raise HTTPException(status_code=404, detail=f"Data not found for symbol {symbol}")
-    logger.info(f"Stock data: {data}")
-    return data
\ No newline at end of file
+    logger.info("Stock data: %s", summarize(data))
+    return data
+
+@app.get("/history/{symbol}", tags=["Stock"])
+async def get_history(symbol: str, start: Optional[date] = None, end: Optional[date] = None):
+    """Daily OHLCV history for a symbol from the local price store (trailing year by default)."""
+    start, end = _default_range(start, end)
+    logger.info("/history/%s called for %s..%s.", symbol, start, end)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return await asyncio.to_thread(market_data_fetcher.get_history, symbol, start, end)
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
+    except Exception as e:
+        logger.error("Error in /history/%s: %s", symbol, e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/returns", tags=["Stock"])
+async def get_returns(request: ReturnsRequest):
+    """Aligned daily return matrix (dates x symbols) for many symbols."""
+    start, end = _default_range(request.start, request.end)
+    logger.info("/returns called for %s symbols, %s..%s.", len(request.symbols), start, end)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return await asyncio.to_thread(market_data_fetcher.get_returns, request.symbols, start, end, request.log)
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
+    except Exception as e:
+        logger.error("Error in /returns: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _parse_symbols(value) -> List[str]:
+    """Symbols from a list or a comma-separated string, upper-cased and de-duplicated."""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError("symbols must be a list of strings or a comma-separated string")
+    return list(dict.fromkeys(v.strip().upper() for v in value if v.strip()))
+
+async def _send_quote_messages(websocket: WebSocket, subscriber: QuoteSubscriber):
+    """The only writer to the socket: replies and quote updates, in order."""
+    while True:
+        for message in await subscriber.next_messages():
+            await websocket.send_json(message)
+
+@app.get("/quotes/subscriptions", tags=["Stock"])
+async def get_quote_subscriptions():
+    """Symbols being polled for /ws/quotes and how many clients follow each."""
+    return quote_hub.stats()
+
+@app.websocket("/ws/quotes")
+async def quote_subscriptions(websocket: WebSocket):
+    """
+    Live quotes. Send {"action": "subscribe" | "unsubscribe", "symbols": [...]} (or pass
+    ?symbols=TSM,AAPL). The server pushes {"type": "quotes", "quotes": {symbol: fields}},
+    with the full last quote on subscribe and only the changed fields afterwards.
+    """
+    await websocket.accept()
+    subscriber = QuoteSubscriber()
+
+    def handle(message) -> Dict:
+        try:
+            if not isinstance(message, dict) or message.get("action") not in ("subscribe", "unsubscribe"):
+                raise ValueError("action must be 'subscribe' or 'unsubscribe'")
+            symbols = _parse_symbols(message.get("symbols", []))
+            if message["action"] == "unsubscribe":
+                quote_hub.unsubscribe(subscriber, symbols)
+            elif len(subscriber.symbols | set(symbols)) > MAX_SUBSCRIBED_SYMBOLS:
+                raise ValueError(f"at most {MAX_SUBSCRIBED_SYMBOLS} symbols per connection")
+            else:
+                quote_hub.subscribe(subscriber, symbols)
+        except ValueError as e:
+            return {"type": "error", "detail": str(e)}
+        return {"type": "subscribed", "symbols": sorted(subscriber.symbols)}
+
+    async def receive_requests():
+        if "symbols" in websocket.query_params:
+            subscriber.reply(handle({"action": "subscribe", "symbols": websocket.query_params["symbols"]}))
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                message = None
+            subscriber.reply(handle(message))
+
+    sender = asyncio.create_task(_send_quote_messages(websocket, subscriber))
+    receiver = asyncio.create_task(receive_requests())
+    try:
+        # Whichever side stops first ends the connection, so a dead sender stops subscriptions too
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error("Error in /ws/quotes: %s", e)
+    finally:
+        quote_hub.unsubscribe(subscriber)
+        sender.cancel()
+        receiver.cancel()
+        await asyncio.wait({sender, receiver})
+        for task in (sender, receiver):
+            if not task.cancelled():
+                task.exception()  # retrieve it, so asyncio does not log it as never retrieved
+        # Close only once the sender has stopped, so the socket never has two writers
+        if websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await websocket.close()
+            except Exception:
+                pass  # the client went away while we were closing
+        logger.info("/ws/quotes client disconnected.")
@@ -1,22 +1,27 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-import faiss
+from typing import List, Dict, Literal, Optional, Tuple
+import asyncio
+import os
+import re
+import uuid
 import numpy as np
 from datetime import datetime
-import logging
+from utils.logging_setup import setup_logging, get_sampled_logger
+from utils.lazy import ensure_loaded, lazy_import
+from utils.warmup import add_warmup
+from utils.admission import add_admission_control
+from utils.metrics import instrument_app, track_stage
+from data_ingestion.embedder import EmbeddingService
+from data_ingestion.lexical_index import BM25Index, reciprocal_rank_fusion
+from data_ingestion.shared_index import MappedIndex
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.FileHandler("retriever_agent.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("retriever_agent")
+logger = setup_logging("retriever_agent")
+health_logger = get_sampled_logger("retriever_agent.health")
+
+faiss = lazy_import("faiss")
 
 app = FastAPI(
     title="Retriever Agent",
@@ -33,98 +38,275 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+add_admission_control(app)
+instrument_app(app, "retriever")
+
 class Document(BaseModel):
     text: str
     metadata: Dict
     embedding: List[float]
 
+class TextDocument(BaseModel):
+    text: str
+    metadata: Dict = {}
+
+SearchMode = Literal["vector", "lexical", "hybrid"]
+
 class QueryRequest(BaseModel):
-    query_embedding: List[float]
+    query_embedding: Optional[List[float]] = None
+    query_text: Optional[str] = None
+    # vector: FAISS only; lexical: BM25 over query_text; hybrid: rank fusion of both
+    mode: SearchMode = "vector"
     top_k: int = 5
+    # Applies to vector similarity; lexical matches are not filtered
     threshold: float = 0.7
 
+class TextQueryRequest(BaseModel):
+    query: str
+    mode: SearchMode = "hybrid"
+    top_k: int = 5
+    # Hashing embeddings score lower than dense models, so nothing is filtered by default
+    threshold: float = 0.0
+
 class IndexInfo(BaseModel):
     dimension: int
     total_documents: int
+    lexical_index: Dict
     last_updated: str
+    # Set for the server-embedded text store: vectors only compare within one embedder
+    embedder: Optional[str] = None
+    # Changes whenever the index starts out empty, so clients can tell their data is gone
+    index_id: str
 
 class VectorStore:
-    def __init__(self, dimension: int = 768):
+    def __init__(self, dimension: int = 768, embedder: Optional[str] = None):
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
+        self.embedder = embedder
+        self.index_id = uuid.uuid4().hex
+        self._index = None
         self.documents = []
+        self.lexical = BM25Index()
         self.last_updated = datetime.now()
 
+    @property
+    def index(self):
+        """FAISS index, created (and faiss imported) on first use."""
+        if self._index is None:
+            self._index = faiss.IndexFlatL2(self.dimension)
+        return self._index
+
     def add_documents(self, documents: List[Document]):
         if not documents:
             return
         embeddings = [doc.embedding for doc in documents]
-        embeddings_array = np.array(embeddings).astype('float32')
-        self.index.add(embeddings_array)
+        self.add_embedded(documents, np.array(embeddings).astype('float32'))
+
+    def add_embedded(self, documents: List, embeddings_array: np.ndarray):
+        """Add documents alongside their (n, dimension) float32 embedding matrix."""
+        with track_stage("retriever.faiss.add"):
+            self.index.add(embeddings_array)
+        with track_stage("retriever.bm25.add"):
+            self.lexical.add([doc.text for doc in documents])
         self.documents.extend(documents)
         self.last_updated = datetime.now()
-        logger.info(f"Added {len(documents)} documents to vector store.")
+        logger.info("Added %s documents to vector store.", len(documents))
 
-    def search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    def _result(self, idx: int, score: float, **extra) -> Dict:
+        doc = self.documents[idx]
+        return {"text": doc.text, "metadata": doc.metadata, "score": score, **extra}
+
+    def _vector_candidates(self, query_embedding: List[float], top_k: int) -> List[Tuple[int, float]]:
         query_array = np.array([query_embedding]).astype('float32')
-        distances, indices = self.index.search(query_array, top_k)
-        results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx < len(self.documents):
-                doc = self.documents[idx]
-                results.append({
-                    "text": doc.text,
-                    "metadata": doc.metadata,
-                    "score": float(1 / (1 + distance))  # Convert distance to similarity score
-                })
-        logger.info(f"Search returned {len(results)} results.")
+        with track_stage("retriever.faiss.search"):
+            distances, indices = self.index.search(query_array, top_k)
+        # Convert distance to similarity score; FAISS pads with -1 when the index is small
+        return [(int(idx), float(1 / (1 + distance)))
+                for distance, idx in zip(distances[0], indices[0]) if 0 <= idx < len(self.documents)]
+
+    def _lexical_candidates(self, query_text: str, top_k: int) -> List[Tuple[int, float]]:
+        with track_stage("retriever.bm25.search"):
+            ids, scores = self.lexical.search(query_text, top_k)
+        return list(zip(ids.tolist(), scores.tolist()))
+
+    def search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+        results = [self._result(idx, score) for idx, score in self._vector_candidates(query_embedding, top_k)]
+        logger.info("Search returned %s results.", len(results))
         return results
 
+    def search_lexical(self, query_text: str, top_k: int = 5) -> List[Dict]:
+        return [self._result(idx, score) for idx, score in self._lexical_candidates(query_text, top_k)]
+
+    def search_hybrid(self, query_embedding: List[float], query_text: str, top_k: int = 5,
+                      threshold: float = 0.0, candidates: Optional[int] = None) -> List[Dict]:
+        """
+        Reciprocal-rank fusion of the FAISS and BM25 rankings, each cut to `candidates`
+        (default 4 x top_k, at least 20). Scores are fused ranks, not similarities.
+        """
+        candidates = candidates or max(4 * top_k, 20)
+        vector = [(idx, score) for idx, score in self._vector_candidates(query_embedding, candidates)
+                  if score >= threshold]
+        lexical = self._lexical_candidates(query_text, candidates)
+        vector_scores, lexical_scores = dict(vector), dict(lexical)
+        with track_stage("retriever.fuse"):
+            fused = reciprocal_rank_fusion([[idx for idx, _ in vector], [idx for idx, _ in lexical]])
+        return [
+            self._result(idx, score, vector_score=vector_scores.get(idx), lexical_score=lexical_scores.get(idx))
+            for idx, score in fused[:top_k]
+        ]
+
     def get_info(self) -> IndexInfo:
         return IndexInfo(
             dimension=self.dimension,
             total_documents=len(self.documents),
-            last_updated=self.last_updated.isoformat()
+            lexical_index=self.lexical.stats(),
+            last_updated=self.last_updated.isoformat(),
+            embedder=self.embedder,
+            index_id=self.index_id
         )
 
-# Initialize vector store
-vector_store = VectorStore()
+class SharedVectorStore(VectorStore):
+    """
+    VectorStore for running several workers: vectors and documents live in a MappedIndex
+    under AGENT_SHARED_STATE_DIR, so one copy is shared through the page cache. Each worker
+    picks up documents added by the others before every search and tails them into its own
+    BM25 index, which is small next to the vectors.
+    """
+    def __init__(self, dimension: int, root: str, embedder: Optional[str] = None):
+        super().__init__(dimension, embedder)
+        self.shared = MappedIndex(root, dimension)
+        self.index_id = self.shared.index_id
+        self.documents = self.shared
+        self._sync()
+
+    def _sync(self):
+        start, end = self.shared.refresh()
+        if end > start:
+            with track_stage("retriever.bm25.add"):
+                self.lexical.add([self.shared[i].text for i in range(start, end)])
+            self.last_updated = datetime.now()
+
+    def add_embedded(self, documents: List, embeddings_array: np.ndarray):
+        self.shared.append([{"text": doc.text, "metadata": doc.metadata} for doc in documents], embeddings_array)
+        self._sync()
+        logger.info("Added %s documents to shared vector store.", len(documents))
+
+    def _vector_candidates(self, query_embedding: List[float], top_k: int) -> List[Tuple[int, float]]:
+        self._sync()
+        with track_stage("retriever.faiss.search"):
+            distances, indices = self.shared.search(np.asarray(query_embedding), top_k)
+        return [(int(idx), float(1 / (1 + distance))) for distance, idx in zip(distances, indices) if idx >= 0]
+
+    def _lexical_candidates(self, query_text: str, top_k: int) -> List[Tuple[int, float]]:
+        self._sync()
+        return super()._lexical_candidates(query_text, top_k)
+
+    def get_info(self) -> IndexInfo:
+        self._sync()
+        return super().get_info()
+
+def _make_store(dimension: int, name: str, embedder: Optional[str] = None) -> VectorStore:
+    """In-process store, or a SharedVectorStore under AGENT_SHARED_STATE_DIR/<name>."""
+    shared_dir = os.getenv("AGENT_SHARED_STATE_DIR")
+    if shared_dir:
+        return SharedVectorStore(dimension, os.path.join(shared_dir, name), embedder)
+    return VectorStore(dimension, embedder)
+
+# Caller-embedded documents (/add-documents, /search) and server-embedded texts (/add-texts,
+# /search-text) come from different models, so their vectors never share an index. The text
+# store is keyed by embedder name, so changing EMBEDDER starts a fresh index.
+embedding_service = EmbeddingService()
+vector_store = _make_store(int(os.getenv("VECTOR_DIMENSION", 768)), "retriever")
+_embedder_name = embedding_service.embedder.name
+text_store = _make_store(embedding_service.dimension,
+                         os.path.join("retriever-texts", re.sub(r"[^A-Za-z0-9._-]", "_", _embedder_name)),
+                         embedder=_embedder_name)
+
+add_warmup(app, logger, {
+    "faiss": lambda: ensure_loaded(faiss),
+    "embedder": lambda: embedding_service.embedder.embed(["warm-up"]),
+})
 
 @app.post("/add-documents", tags=["Index"])
 async def add_documents(documents: List[Document]):
     """Add documents (with embeddings) to the vector store."""
-    logger.info(f"/add-documents called with {len(documents)} documents.")
+    logger.info("/add-documents called with %s documents.", len(documents))
+    if any(len(doc.embedding) != vector_store.dimension for doc in documents):
+        raise HTTPException(status_code=400, detail=f"embeddings must have {vector_store.dimension} dimensions")
     try:
         vector_store.add_documents(documents)
         return {"status": "success", "documents_added": len(documents)}
     except Exception as e:
-        logger.error(f"Error in /add-documents: {e}")
+        logger.error("Error in /add-documents: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _run_search(store: VectorStore, mode: str, query_embedding, query_text: Optional[str],
+                top_k: int, threshold: float) -> List[Dict]:
+    if mode == "lexical":
+        return store.search_lexical(query_text, top_k)
+    if mode == "hybrid":
+        return store.search_hybrid(query_embedding, query_text, top_k, threshold)
+    results = store.search(query_embedding=query_embedding, top_k=top_k)
+    return [r for r in results if r["score"] >= threshold]
+
 @app.post("/search", tags=["Retrieval"])
 async def search(request: QueryRequest):
-    """Search for top-k similar documents given a query embedding."""
-    logger.info(f"/search called with top_k={request.top_k}, threshold={request.threshold}")
+    """Search for top-k documents by query embedding, query text (BM25), or both fused."""
+    logger.info("/search called with mode=%s, top_k=%s, threshold=%s", request.mode, request.top_k, request.threshold)
+    if request.mode != "lexical" and request.query_embedding is None:
+        raise HTTPException(status_code=400, detail=f"query_embedding is required for {request.mode} search")
+    if request.mode != "vector" and not request.query_text:
+        raise HTTPException(status_code=400, detail=f"query_text is required for {request.mode} search")
+    if request.query_embedding is not None and len(request.query_embedding) != vector_store.dimension:
+        raise HTTPException(status_code=400, detail=f"query_embedding must have {vector_store.dimension} dimensions")
     try:
-        results = vector_store.search(
-            query_embedding=request.query_embedding,
-            top_k=request.top_k
-        )
-        filtered_results = [r for r in results if r["score"] >= request.threshold]
-        logger.info(f"Search returned {len(filtered_results)} filtered results.")
+        filtered_results = _run_search(vector_store, request.mode, request.query_embedding, request.query_text,
+                                       request.top_k, request.threshold)
+        logger.info("Search returned %s filtered results.", len(filtered_results))
         return {"results": filtered_results}
     except Exception as e:
-        logger.error(f"Error in /search: {e}")
+        logger.error("Error in /search: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/add-texts", tags=["Index"])
+async def add_texts(documents: List[TextDocument]):
+    """Embed raw text chunks on the server and add them to the text store."""
+    logger.info("/add-texts called with %s documents.", len(documents))
+    try:
+        if not documents:
+            return {"status": "success", "documents_added": 0}
+        embeddings = await asyncio.to_thread(embedding_service.embed, [doc.text for doc in documents])
+        text_store.add_embedded(documents, embeddings)
+        return {"status": "success", "documents_added": len(documents)}
+    except Exception as e:
+        logger.error("Error in /add-texts: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search-text", tags=["Retrieval"])
+async def search_text(request: TextQueryRequest):
+    """Search for top-k documents given a text query (hybrid BM25 + vector by default)."""
+    logger.info("/search-text called with mode=%s, top_k=%s, threshold=%s", request.mode, request.top_k, request.threshold)
+    try:
+        embedding = None
+        if request.mode != "lexical":
+            embedding = (await asyncio.to_thread(embedding_service.embed, [request.query]))[0]
+        return {"results": _run_search(text_store, request.mode, embedding, request.query, request.top_k, request.threshold)}
+    except Exception as e:
+        logger.error("Error in /search-text: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/embedding-stats", tags=["Utility"])
+async def embedding_stats():
+    """Embedder name, cache hit counts and throughput in chunks/sec."""
+    return embedding_service.stats()
+
 @app.get("/info", tags=["Utility"])
-async def get_info():
-    """Get vector store index info."""
-    logger.info("/info called.")
-    return vector_store.get_info()
+async def get_info(store: Literal["documents", "texts"] = "documents"):
+    """Index info for caller-embedded documents, or for server-embedded texts with store=texts."""
+    logger.info("/info called for %s.", store)
+    return (text_store if store == "texts" else vector_store).get_info()
 
 @app.get("/health", tags=["Utility"])
 async def health_check():
     """Health check endpoint."""
-    logger.info("Health check called.")
+    health_logger.info("Health check called.")
     return {"status": "healthy"}
\ No newline at end of file
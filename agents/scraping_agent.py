@@ -1,20 +1,22 @@
+import asyncio
+import os
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-import logging
+from data_ingestion import scraper as scraper_module
 from data_ingestion.scraper import FinancialScraper
+from utils.lazy import ensure_loaded
+from utils.logging_setup import setup_logging, get_sampled_logger, summarize
+from utils.admission import add_admission_control
+from utils.metrics import instrument_app
+from utils.rate_limit import UpstreamThrottled, throttled_error
+from utils.scheduler import PrewarmConfig, PrewarmScheduler, cache_refresh_job
+from utils.warmup import add_warmup
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.FileHandler("scraping_agent.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("scraping_agent")
+logger = setup_logging("scraping_agent")
+health_logger = get_sampled_logger("scraping_agent.health")
 
 app = FastAPI(
     title="Scraping Agent",
@@ -31,40 +33,125 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+add_admission_control(app)
+instrument_app(app, "scraping")
+
 scraper = FinancialScraper()
 
+# Refresh world-indices sentiment and yields shortly before the morning brief
+prewarm_scheduler = PrewarmScheduler("scraping_agent", PrewarmConfig.from_env())
+# Every region is split out of the same page, so one job scrapes it once
+_regions = prewarm_scheduler.config.regions
+prewarm_scheduler.add_job("sentiment", "all", cache_refresh_job(
+    scraper.cache, [('world_indices',)], lambda: scraper.get_market_sentiments(_regions, refresh=True)))
+prewarm_scheduler.add_job("yields", "all", cache_refresh_job(
+    scraper.cache, [('yields',)], lambda: scraper.get_yield_data(refresh=True)))
+
+@app.on_event("startup")
+async def start_prewarm():
+    if prewarm_scheduler.config.enabled:
+        prewarm_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_prewarm():
+    await prewarm_scheduler.stop()
+
+add_warmup(app, logger, {
+    "requests": lambda: ensure_loaded(scraper_module.requests),
+    "bs4": lambda: ensure_loaded(scraper_module.bs4),
+})
+
+MAX_BATCH_SIZE = int(os.getenv("SCRAPER_MAX_BATCH", 50))
+
 class ScrapingRequest(BaseModel):
     symbol: Optional[str] = None
     region: Optional[str] = None
 
+class RegionBatch(BaseModel):
+    regions: List[str]
+
+class SymbolBatch(BaseModel):
+    symbols: List[str]
+
+def _check_batch(keys: List[str], what: str):
+    if not keys:
+        raise HTTPException(status_code=400, detail=f"{what} must not be empty")
+    if len(keys) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_BATCH_SIZE} {what} per request")
+
 @app.get("/health", tags=["Utility"])
 async def health_check():
     """Health check endpoint."""
-    logger.info("Health check called.")
+    health_logger.info("Health check called.")
     return {"status": "healthy"}
 
+@app.get("/prewarm/status", tags=["Utility"])
+async def get_prewarm_status():
+    """Freshness of pre-warmed datasets (warm, stale or cold)."""
+    return prewarm_scheduler.status()
+
+@app.post("/prewarm/run", tags=["Utility"])
+async def run_prewarm():
+    """Refresh every pre-warmed dataset immediately, without jitter."""
+    await prewarm_scheduler.run_once(jitter=0)
+    return prewarm_scheduler.status()
+
 @app.get("/market-sentiment/{region}", tags=["Sentiment"])
 async def get_market_sentiment(region: str):
     """Scrape market sentiment indicators for a region."""
-    logger.info(f"/market-sentiment/{region} called.")
+    logger.info("/market-sentiment/%s called.", region)
     try:
-        sentiment = scraper.get_market_sentiment(region)
-        logger.info(f"Sentiment result: {sentiment}")
+        sentiment = await asyncio.to_thread(scraper.get_market_sentiment, region)
+        logger.info("Sentiment result: %s", summarize(sentiment))
         return sentiment
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
     except Exception as e:
-        logger.error(f"Error in /market-sentiment/{region}: {e}")
+        logger.error("Error in /market-sentiment/%s: %s", region, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/company-filings/{symbol}", tags=["Filings"])
 async def get_company_filings(symbol: str):
     """Get recent company filings for a symbol."""
-    logger.info(f"/company-filings/{symbol} called.")
+    logger.info("/company-filings/%s called.", symbol)
+    try:
+        filings = await asyncio.to_thread(scraper.get_company_filings, symbol)
+        logger.info("Filings result: %s", summarize(filings))
+        return {"filings": filings}
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
+    except Exception as e:
+        logger.error("Error in /company-filings/%s: %s", symbol, e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/market-sentiment", tags=["Sentiment"])
+async def get_market_sentiments(request: RegionBatch):
+    """Market sentiment for several regions from a single scrape of the world-indices page."""
+    logger.info("/market-sentiment called for regions: %s", summarize(request.regions))
+    _check_batch(request.regions, "regions")
+    try:
+        sentiments = await asyncio.to_thread(scraper.get_market_sentiments, request.regions)
+        logger.info("Sentiment results: %s", summarize(sentiments))
+        return {"sentiments": sentiments}
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
+    except Exception as e:
+        logger.error("Error in /market-sentiment: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/company-filings", tags=["Filings"])
+async def get_company_filings_batch(request: SymbolBatch):
+    """Recent company filings for several symbols, fetching uncached pages concurrently."""
+    logger.info("/company-filings called for symbols: %s", summarize(request.symbols))
+    _check_batch(request.symbols, "symbols")
     try:
-        filings = scraper.get_company_filings(symbol)
-        logger.info(f"Filings result: {filings}")
+        filings = await asyncio.to_thread(scraper.get_company_filings_batch, request.symbols)
+        logger.info("Filings results: %s", summarize(filings))
         return {"filings": filings}
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
     except Exception as e:
-        logger.error(f"Error in /company-filings/{symbol}: {e}")
+        logger.error("Error in /company-filings: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/yield-data", tags=["Yield"])
@@ -72,9 +159,11 @@ async def get_yield_data():
     """Get current yield data."""
     logger.info("/yield-data called.")
     try:
-        data = scraper.get_yield_data()
-        logger.info(f"Yield data: {data}")
+        data = await asyncio.to_thread(scraper.get_yield_data)
+        logger.info("Yield data: %s", summarize(data))
         return data
+    except UpstreamThrottled as e:
+        raise throttled_error(e)
     except Exception as e:
-        logger.error(f"Error in /yield-data: {e}")
+        logger.error("Error in /yield-data: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
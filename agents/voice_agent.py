@@ -1,16 +1,44 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Optional
-import whisper
-from gtts import gTTS
 import tempfile
 import os
+import threading
 from datetime import datetime
+from utils.lazy import ensure_loaded, lazy_import
+from utils.logging_setup import setup_logging
+from utils.admission import add_admission_control
+from utils.metrics import instrument_app, track_stage
+from utils.warmup import add_warmup
+
+logger = setup_logging("voice_agent")
+
+# Whisper pulls in torch and model weights, so it is only loaded for speech-to-text
+whisper = lazy_import("whisper")
+gtts = lazy_import("gtts")
 
 app = FastAPI()
 
-# Initialize Whisper model
-model = whisper.load_model("base")
+add_admission_control(app)
+instrument_app(app, "voice")
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Whisper model (WHISPER_MODEL, default "base"), loaded on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            with track_stage("voice.whisper.load"):
+                _model = whisper.load_model(os.getenv("WHISPER_MODEL", "base"))
+    return _model
+
+add_warmup(app, logger, {
+    "gtts": lambda: ensure_loaded(gtts),
+    "whisper": get_model,
+})
 
 class TextToSpeechRequest(BaseModel):
     text: str
@@ -32,7 +60,8 @@ async def speech_to_text(audio: UploadFile = File(...)):
             temp_audio.flush()
 
         # Transcribe audio using Whisper
-        result = model.transcribe(temp_audio.name)
+        with track_stage("voice.whisper.transcribe"):
+            result = get_model().transcribe(temp_audio.name)
 
         # Clean up temporary file
         os.unlink(temp_audio.name)
@@ -53,8 +82,9 @@ async def text_to_speech(request: TextToSpeechRequest):
         # Create temporary file for audio output
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
             # Convert text to speech
-            tts = gTTS(text=request.text, lang=request.language)
-            tts.save(temp_audio.name)
+            with track_stage("voice.tts.synthesize"):
+                tts = gtts.gTTS(text=request.text, lang=request.language)
+                tts.save(temp_audio.name)
 
             # Read the audio file
             with open(temp_audio.name, 'rb') as audio_file:
@@ -63,7 +93,7 @@ async def text_to_speech(request: TextToSpeechRequest):
             # Clean up temporary file
             os.unlink(temp_audio.name)
 
-            return audio_content
+            return Response(content=audio_content, media_type="audio/mpeg")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,103 @@
+"""
+Per-request logging cost before and after the shared logging setup.
+
+"Before" reproduces the original agent configuration: a synchronous FileHandler on the
+root logger and f-string messages that dump the full payload. "After" uses
+utils.logging_setup: queued background writes, lazy %-formatting with payload summaries
+and sampled health-check logging.
+
+Usage:
+    python -m benchmarks.bench_logging [--iterations 20000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from utils import logging_setup
+from utils.logging_setup import get_sampled_logger, setup_logging, shutdown_logging, summarize
+
+# A representative /analyze result plus a scraped sentiment payload
+PAYLOAD = {
+    "portfolio_metrics": {
+        "total_value": 125_000_000,
+        "sector_allocation": {f"Sector {i}": 100 / 12 for i in range(12)},
+    },
+    "earnings_analysis": {"total_reports": 40, "positive_surprises": 24,
+                          "negative_surprises": 16, "average_surprise": 1.7},
+    "market_sentiment": "neutral",
+    "indicators": [{"name": f"Index {i}", "change": f"{i / 10:+.2f}%"} for i in range(60)],
+    "timestamp": "2025-05-29T08:00:00",
+}
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_before(log_dir: str, iterations: int) -> dict:
+    logger = logging.getLogger("bench_before")
+    handler = logging.FileHandler(os.path.join(log_dir, "before.log"))
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    try:
+        results = {
+            "payload_info": _per_call_us(lambda: logger.info(f"Analysis result: {PAYLOAD}"), iterations),
+            "health_info": _per_call_us(lambda: logger.info("Health check called."), iterations),
+        }
+        logger.setLevel(logging.WARNING)
+        # f-strings are formatted even though the record is dropped
+        results["payload_dropped"] = _per_call_us(
+            lambda: logger.info(f"Analysis result: {PAYLOAD}"), iterations)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    return results
+
+
+def bench_after(log_dir: str, iterations: int) -> dict:
+    os.environ["LOG_DIR"] = log_dir
+    logger = setup_logging("bench_after", "after.log")
+    # Keep stderr out of the measurement; the file handler still runs on the listener
+    listener = logging_setup._listeners["bench_after"]
+    listener.handlers = tuple(h for h in listener.handlers
+                              if not type(h) is logging.StreamHandler)
+    health_logger = get_sampled_logger("bench_after.health")
+    try:
+        results = {
+            "payload_info": _per_call_us(
+                lambda: logger.info("Analysis result: %s", summarize(PAYLOAD)), iterations),
+            "health_info": _per_call_us(
+                lambda: health_logger.info("Health check called."), iterations),
+        }
+        logger.setLevel(logging.WARNING)
+        results["payload_dropped"] = _per_call_us(
+            lambda: logger.info("Analysis result: %s", summarize(PAYLOAD)), iterations)
+    finally:
+        shutdown_logging("bench_after")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        before = bench_before(log_dir, args.iterations)
+        after = bench_after(log_dir, args.iterations)
+
+    print(f"{'case':<18}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for case in before:
+        speedup = before[case] / after[case] if after[case] else float("inf")
+        print(f"{case:<18}{before[case]:>14.2f}{after[case]:>14.2f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Offline load test for every agent endpoint and for the end-to-end market brief.
+
+Each agent runs in-process on a local port with its upstreams replaced by
+benchmarks.standins (recorded HTML fixtures, stubbed yfinance and TTS, a templated
+Language Agent). Results are written as JSON so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.load_test [--concurrency 16] [--requests 200]
+                                   [--upstream-latency-ms 20] [--endpoints api.stock,brief]
+                                   [--output-dir benchmarks/results] [--compare PREVIOUS.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from unittest import mock
+
+import httpx
+import numpy as np
+import uvicorn
+
+from benchmarks import standins
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+SAMPLE_POSITIONS = [
+    {"symbol": "TSM", "value": 22_000_000, "region": "Asia", "sector": "Technology"},
+    {"symbol": "005930.KS", "value": 9_500_000, "region": "Asia", "sector": "Technology"},
+    {"symbol": "AAPL", "value": 31_000_000, "region": "US", "sector": "Technology"},
+    {"symbol": "JPM", "value": 12_500_000, "region": "US", "sector": "Financials"},
+    {"symbol": "SAP", "value": 8_000_000, "region": "Europe", "sector": "Technology"},
+]
+
+# name -> (service, method, path, json body)
+SCENARIOS = {
+    "api.stock": ("api", "GET", "/stock/TSM", None),
+    "api.earnings": ("api", "POST", "/earnings-surprises", {"symbols": ["TSM", "005930.KS", "AAPL"]}),
+    "api.exposure": ("api", "POST", "/asia-tech-exposure", {"positions": SAMPLE_POSITIONS}),
+    "api.returns": ("api", "POST", "/returns", {"symbols": ["TSM", "005930.KS", "AAPL", "MSFT"],
+                                                "start": "2023-01-01", "end": "2024-12-31"}),
+    "scraping.sentiment": ("scraping", "GET", "/market-sentiment/Asia", None),
+    "scraping.filings": ("scraping", "GET", "/company-filings/TSM", None),
+    "scraping.sentiment_batch": ("scraping", "POST", "/market-sentiment", {"regions": ["Asia", "US", "Europe"]}),
+    "scraping.filings_batch": ("scraping", "POST", "/company-filings",
+                               {"symbols": ["TSM", "005930.KS", "9988.HK", "AAPL"]}),
+    "scraping.yields": ("scraping", "GET", "/yield-data", None),
+    "retriever.search": ("retriever", "POST", "/search", None),  # body built after seeding
+    "retriever.add_texts": ("retriever", "POST", "/add-texts", [
+        {"text": f"{symbol} quarterly filing: revenue grew on {driver} demand.", "metadata": {"symbol": symbol}}
+        for symbol in ("TSM", "005930.KS", "9988.HK", "6758.T") for driver in ("AI", "memory", "cloud", "consumer")
+    ]),
+    "retriever.search_text": ("retriever", "POST", "/search-text",
+                              {"query": "TSM revenue growth on AI demand", "top_k": 5}),
+    "analysis.analyze": ("analysis", "POST", "/analyze", {
+        "market_data": {},
+        "earnings_data": [{"symbol": "TSM", "surprise_percentage": 4.2},
+                          {"symbol": "005930.KS", "surprise_percentage": -2.0}],
+        "sentiment_data": {"indicators": [{"name": "Nikkei 225", "change": "+0.8%"},
+                                          {"name": "Hang Seng Index", "change": "-0.3%"}]},
+        "portfolio_data": {"total_value": 83_000_000, "positions": SAMPLE_POSITIONS},
+    }),
+    "voice.tts": ("voice", "POST", "/text-to-speech", {"text": "Asia tech allocation is 22% of AUM."}),
+    "brief": ("orchestrator", "POST", "/process-query", {
+        "query": "What's our risk exposure in Asia tech stocks today?", "region": "Asia"}),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app) -> (uvicorn.Server, str):
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def start_stack(upstream_latency: float):
+    """Start the stand-ins and every agent; return (service -> url, patches, servers)."""
+    os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="agent-logs-"))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("PREWARM_ENABLED", "false")
+    os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="price-store-"))
+    os.environ.setdefault("EXPOSURE_STORE_DIR", tempfile.mkdtemp(prefix="exposure-store-"))
+
+    from agents import analysis_agent, api_agent, retriever_agent, scraping_agent, voice_agent
+    from orchestrator import coordinator
+
+    upstream = standins.FakeUpstreamServer(latency=upstream_latency).start()
+    standins.StubTicker.latency = upstream_latency
+    scraping_agent.scraper.base_urls = {"yahoo_finance": upstream.url, "market_watch": upstream.url}
+    patches = [
+        mock.patch("yfinance.Ticker", standins.StubTicker),
+        mock.patch("gtts.gTTS", standins.StubTTS),
+    ]
+    for patch in patches:
+        patch.start()
+
+    apps = {
+        "api": api_agent.app,
+        "scraping": scraping_agent.app,
+        "analysis": analysis_agent.app,
+        "retriever": retriever_agent.app,
+        "voice": voice_agent.app,
+        "language": standins.language_app,
+    }
+    servers = [upstream]
+    urls = {}
+    for name, app in apps.items():
+        server, urls[name] = _serve(app)
+        servers.append(server)
+    coordinator.orchestrator.services.update(urls)
+    server, urls["orchestrator"] = _serve(coordinator.app)
+    servers.append(server)
+    return urls, patches, servers
+
+
+def stop_stack(patches, servers):
+    for patch in patches:
+        patch.stop()
+    for server in servers:
+        if isinstance(server, uvicorn.Server):
+            server.should_exit = True
+        else:
+            server.stop()
+
+
+def _seed_retriever(url: str, documents: int = 2000, dimension: int = 768) -> Dict:
+    rng = np.random.default_rng(0)
+    vectors = rng.random((documents, dimension), dtype=np.float32)
+    batch = [
+        {"text": f"Filing chunk {i}", "metadata": {"doc": i}, "embedding": vectors[i].tolist()}
+        for i in range(documents)
+    ]
+    httpx.post(f"{url}/add-documents", json=batch, timeout=120.0).raise_for_status()
+    return {"query_embedding": vectors[0].tolist(), "top_k": 5, "threshold": 0.0}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(np.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, method: str, url: str, body: Optional[Dict],
+                       concurrency: int, total: int, warmup: int = 5) -> Dict:
+    for _ in range(warmup):
+        await client.request(method, url, json=body)
+
+    latencies: List[float] = []
+    errors = 0
+    shed = 0  # 429/503 from admission control, counted apart from real failures
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors, shed
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                rejected = response.status_code in (429, 503)
+                failed = response.status_code >= 400 and not rejected
+            except httpx.HTTPError:
+                rejected, failed = False, True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+            shed += rejected
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "shed": shed,
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+async def run_load(urls: Dict[str, str], names: List[str], concurrency: int, total: int) -> Dict:
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        for name in names:
+            service, method, path, body = SCENARIOS[name]
+            if name == "retriever.search":
+                body = await asyncio.to_thread(_seed_retriever, urls["retriever"])
+            results[name] = await run_scenario(
+                client, method, f"{urls[service]}{path}", body, concurrency, total)
+            print(f"{name:<24} {results[name]['throughput_rps']:>9.1f} req/s  "
+                  f"p50 {results[name]['p50_ms']:>8.2f} ms  p95 {results[name]['p95_ms']:>8.2f} ms  "
+                  f"p99 {results[name]['p99_ms']:>8.2f} ms  errors {results[name]['errors']}  shed {results[name]['shed']}")
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: Dict, previous_path: str):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous['meta']['revision']} ({previous_path}):")
+    print(f"{'endpoint':<20}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in current["endpoints"].items():
+        before = previous["endpoints"].get(name)
+        if not before:
+            continue
+        deltas = [_delta(stats[key], before[key]) for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")]
+        print(f"{name:<20}" + "".join(f"{d:>10}" for d in deltas))
+
+
+def _delta(now: float, before: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(now - before) / before * 100:+.1f}%"
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Offline load test for the finance agents.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0,
+                        help="Simulated round-trip time of each stand-in upstream call")
+    parser.add_argument("--endpoints", default=",".join(SCENARIOS),
+                        help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    urls, patches, servers = start_stack(args.upstream_latency_ms / 1000)
+    try:
+        endpoints = asyncio.run(run_load(urls, names, args.concurrency, args.requests))
+    finally:
+        stop_stack(patches, servers)
+
+    revision = _git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "upstream_latency_ms": args.upstream_latency_ms,
+        },
+        "endpoints": endpoints,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"load_{datetime.now():%Y%m%d_%H%M%S}_{revision}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Local stand-ins for everything the agents normally reach over the internet, so the
+benchmark harness runs offline and reproducibly:
+
+- FakeUpstreamServer: serves recorded Yahoo Finance / MarketWatch HTML fixtures
+- StubTicker: replaces yfinance.Ticker with recorded quotes and earnings and synthetic history
+- StubTTS: replaces gTTS with a fixed mp3 payload
+- language_app: minimal Language Agent (not part of this repository) that templates a brief
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+class FakeUpstreamServer:
+    """
+    Threaded HTTP server standing in for finance.yahoo.com and marketwatch.com.
+    `latency` seconds are slept per request to mimic network round trips.
+    """
+    def __init__(self, latency: float = 0.0):
+        pages = {
+            "/world-indices": _read_fixture("world_indices.html"),
+            "/bonds": _read_fixture("bonds.html"),
+        }
+        filings = _read_fixture("financials.html")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latency)
+                path = self.path.split("?")[0]
+                body = pages.get(path)
+                if body is None and path.startswith("/investing/stock/") and path.endswith("/financials"):
+                    body = filings
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "FakeUpstreamServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubTicker:
+    """Drop-in for yfinance.Ticker backed by benchmarks/fixtures/quotes.json."""
+    latency = 0.0
+    _quotes: Dict = json.loads(_read_fixture("quotes.json"))
+    _default = next(iter(_quotes.values()))
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._record = self._quotes.get(symbol, self._default)
+
+    @property
+    def info(self) -> Dict:
+        time.sleep(self.latency)
+        return dict(self._record["info"])
+
+    @property
+    def earnings(self) -> pd.DataFrame:
+        time.sleep(self.latency)
+        return pd.DataFrame([self._record["earnings"]])
+
+    def history(self, start: str, end: str, auto_adjust: bool = True) -> pd.DataFrame:
+        """Deterministic random-walk business-day bars for [start, end)."""
+        time.sleep(self.latency)
+        days = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        seed = zlib.crc32(self.symbol.encode())
+        origin = pd.Timestamp("2000-01-03")
+        offsets = np.array([(d - origin).days for d in days])
+        rng = np.random.default_rng(seed)
+        drift = np.cumsum(rng.normal(0, 0.01, 10_000))
+        close = self._record["info"]["regularMarketPrice"] * np.exp(drift[offsets % 10_000] - drift[-1])
+        return pd.DataFrame({
+            "Open": close * 0.995, "High": close * 1.01, "Low": close * 0.99,
+            "Close": close, "Volume": np.full(len(days), float(self._record["info"]["regularMarketVolume"])),
+        }, index=days)
+
+
+class StubTTS:
+    """Drop-in for gtts.gTTS that writes a fixed payload instead of calling Google."""
+    payload = b"ID3" + bytes(range(256)) * 16
+
+    def __init__(self, text: str, lang: str = "en"):
+        self.text = text
+        self.lang = lang
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.payload)
+
+
+class LanguageRequest(BaseModel):
+    portfolio_metrics: Dict
+    earnings_analysis: Dict
+    market_sentiment: str
+    query: str
+
+
+language_app = FastAPI(title="Language Agent stand-in")
+
+
+@language_app.post("/analyze")
+async def language_analyze(request: LanguageRequest):
+    earnings = request.earnings_analysis
+    return {
+        "response": (
+            f"{earnings.get('positive_surprises', 0)} of {earnings.get('total_reports', 0)} "
+            f"reports beat estimates. Regional sentiment is {request.market_sentiment}."
+        )
+    }
+
+
+@language_app.get("/health")
+async def language_health():
+    return {"status": "healthy"}
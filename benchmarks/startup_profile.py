@@ -0,0 +1,139 @@
+"""
+Cold-start profile of every agent and the orchestrator.
+
+For each service this reports:
+- import time of the app module and its heaviest direct imports (python -X importtime)
+- time-to-first-healthy: from spawning `uvicorn <module>:app` to the first 200 from /health
+
+Each measurement runs in a fresh interpreter, so nothing is shared with an earlier import.
+
+Usage:
+    python -m benchmarks.startup_profile [--services api,retriever] [--top 5] [--warmup]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import RESULTS_DIR, _git_revision
+
+SERVICES = {
+    "orchestrator": "orchestrator.coordinator",
+    "api": "agents.api_agent",
+    "scraping": "agents.scraping_agent",
+    "analysis": "agents.analysis_agent",
+    "retriever": "agents.retriever_agent",
+    "voice": "agents.voice_agent",
+}
+
+
+def _env(warmup: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="agent-logs-"))
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env.setdefault("PREWARM_ENABLED", "false")
+    env["AGENT_WARMUP"] = "true" if warmup else "false"
+    return env
+
+
+def import_profile(module: str, env: Dict[str, str], top: int) -> Dict:
+    """Total import time of `module` and its `top` most expensive direct imports."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+    # importtime prints children before their parent, so collect depth-1 entries until
+    # the depth-0 line that owns them
+    total, children, pending = None, [], []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative_us = int(cumulative)
+        except ValueError:
+            continue  # header row
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            pending.append((name.strip(), cumulative_us))
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = cumulative_us, pending
+            pending = []
+    children.sort(key=lambda item: -item[1])
+    return {
+        "import_ms": round((total or 0) / 1000, 1),
+        "heaviest_imports_ms": {name: round(us / 1000, 1) for name, us in children[:top]},
+    }
+
+
+def time_to_healthy(module: str, env: Dict[str, str], timeout: float = 120.0) -> Dict:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port),
+                             "--log-level", "warning"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                return {"error": (proc.stderr.read().strip().splitlines() or ["exited"])[-1]}
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    return {"time_to_healthy_ms": round((time.perf_counter() - started) * 1000, 1)}
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        return {"error": f"not healthy after {timeout}s"}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--services", default=",".join(SERVICES),
+                        help="Comma-separated subset of: " + ", ".join(SERVICES))
+    parser.add_argument("--top", type=int, default=5, help="Heaviest direct imports to list")
+    parser.add_argument("--warmup", action="store_true", help="Start agents with AGENT_WARMUP=true")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args(argv)
+
+    env = _env(args.warmup)
+    report = {}
+    for service in [s.strip() for s in args.services.split(",") if s.strip()]:
+        module = SERVICES[service]
+        report[service] = {**import_profile(module, env, args.top), **time_to_healthy(module, env)}
+        result = report[service]
+        if "error" in result:
+            print(f"{service:<14} failed: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["heaviest_imports_ms"].items())
+        print(f"{service:<14} import {result['import_ms']:>8.1f} ms  "
+              f"first healthy {result['time_to_healthy_ms']:>8.1f} ms  ({heaviest})")
+
+    revision = _git_revision()
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"startup_{datetime.now():%Y%m%d_%H%M%S}_{revision}.json")
+    with open(path, "w") as f:
+        json.dump({"meta": {"revision": revision, "timestamp": datetime.now().isoformat(),
+                            "python": sys.version.split()[0], "warmup": args.warmup},
+                   "services": report}, f, indent=2)
+    print(f"\nResults written to {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,150 @@
-import yfinance as yf
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import logging
+import math
+from data_ingestion.exposure import ExposureCube, ExposureStore
+from data_ingestion.price_store import PriceStore
+from utils.cache import MISS, make_cache
+from utils.lazy import lazy_import
+from utils.logging_setup import summarize
+from utils.metrics import track_stage
+from utils.rate_limit import UPSTREAM_LIMITS, YAHOO_FINANCE, UpstreamThrottled
 
 logger = logging.getLogger("api_agent.fetcher")
 
+yf = lazy_import("yfinance")
+
+def _note_upstream_error(e: Exception):
+    """Pause Yahoo requests when yfinance reports that we are being rate limited."""
+    if type(e).__name__ == "YFRateLimitError" or "Too Many Requests" in str(e):
+        UPSTREAM_LIMITS.throttle(YAHOO_FINANCE, 60)
+
 class MarketDataFetcher:
     """
     Fetches and processes market data for the API Agent.
     Includes caching, error handling, and logging for all operations.
     """
     def __init__(self):
-        self.cache = {}
         self.cache_duration = timedelta(minutes=15)
+        self.cache = make_cache(self.cache_duration, "api_agent")
+        self.price_store = PriceStore(recheck_after=self.cache_duration)
+        self.exposure_store = ExposureStore()
 
-    def get_stock_data(self, symbol: str) -> Optional[Dict]:
-        """Fetch current stock data from Yahoo Finance."""
+    def get_stock_data(self, symbol: str, refresh: bool = False) -> Optional[Dict]:
+        """Fetch current stock data from Yahoo Finance, served from cache unless `refresh`."""
+        if not refresh:
+            cached = self.cache.get(('quote', symbol))
+            if cached is not MISS:
+                return cached
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            result = {
-                'symbol': symbol,
-                'price': info.get('regularMarketPrice'),
-                'change': info.get('regularMarketChangePercent'),
-                'volume': info.get('regularMarketVolume'),
-                'timestamp': datetime.now().isoformat()
-            }
-            logger.info(f"Fetched stock data for {symbol}: {result}")
+            UPSTREAM_LIMITS.acquire(YAHOO_FINANCE)
+            with track_stage("fetcher.quote.fetch"):
+                ticker = yf.Ticker(symbol)
+                info = ticker.info
+            with track_stage("fetcher.quote.parse"):
+                result = {
+                    'symbol': symbol,
+                    'price': info.get('regularMarketPrice'),
+                    'change': info.get('regularMarketChangePercent'),
+                    'volume': info.get('regularMarketVolume'),
+                    'timestamp': datetime.now().isoformat()
+                }
+            logger.info("Fetched stock data for %s: %s", symbol, summarize(result))
+            self.cache.set(('quote', symbol), result)
             return result
+        except UpstreamThrottled as e:
+            # Not "no data": let the endpoint shed the request with Retry-After
+            logger.warning("Skipped quote for %s: %s", symbol, e)
+            raise
         except Exception as e:
-            logger.error(f"Error fetching data for {symbol}: {e}")
+            _note_upstream_error(e)
+            logger.error("Error fetching data for %s: %s", symbol, e)
             return None
 
+    def get_history(self, symbol: str, start: date, end: date) -> Dict:
+        """Daily OHLCV bars for [start, end], downloading only ranges not already stored."""
+        columns = self.price_store.read(symbol, start, end)
+        return {
+            'symbol': symbol,
+            'dates': [str(d) for d in columns['date']],
+            **{name: columns[name].tolist() for name in ('open', 'high', 'low', 'close', 'volume')}
+        }
+
+    def get_returns(self, symbols: List[str], start: date, end: date, log: bool = False) -> Dict:
+        """Daily close-to-close returns for many symbols, aligned on dates where all have bars."""
+        dates, returns = self.price_store.returns_matrix(symbols, start, end, log=log)
+        return {
+            'symbols': symbols,
+            'dates': [str(d) for d in dates],
+            # Non-finite values (missing or zero prices) are not valid JSON
+            'returns': [[v if math.isfinite(v) else None for v in row] for row in returns.tolist()]
+        }
+
+    def get_exposure(self, portfolio: Optional[List[Dict]] = None, as_of: Optional[date] = None,
+                     snapshot: bool = False, snapshot_if_missing: bool = False,
+                     region=None, sector=None, currency=None) -> Dict:
+        """
+        Exposure of a region/sector/currency slice with day-over-day and week-over-week deltas.
+        Without `portfolio`, the stored snapshot for `as_of` is used; with `snapshot`, the
+        portfolio's cube is persisted as the snapshot for `as_of` (with `snapshot_if_missing`,
+        only if that day has none yet).
+        """
+        as_of = as_of or date.today()
+        cube = ExposureCube.from_positions(portfolio) if portfolio is not None else None
+        if cube is not None and (snapshot or snapshot_if_missing and not self.exposure_store.has(as_of)):
+            self.exposure_store.save(cube, as_of)
+        return self.exposure_store.query(as_of, cube=cube, region=region, sector=sector, currency=currency)
+
     def get_asia_tech_exposure(self, portfolio: List[Dict]) -> Dict:
-        """Calculate Asia tech exposure from portfolio."""
+        """
+        Calculate Asia tech exposure from portfolio, with changes against stored snapshots.
+        This is the book-of-record path, so the day's first call stores the day's snapshot.
+        """
         try:
-            total_aum = sum(position['value'] for position in portfolio)
-            asia_tech_value = sum(
-                position['value'] for position in portfolio
-                if position.get('region') == 'Asia' and position.get('sector') == 'Technology'
-            )
-            result = {
-                'exposure_percentage': (asia_tech_value / total_aum * 100) if total_aum > 0 else 0,
-                'total_value': asia_tech_value
-            }
-            logger.info(f"Calculated Asia tech exposure: {result}")
+            result = self.get_exposure(portfolio, snapshot_if_missing=True, region='Asia', sector='Technology')
+            logger.info("Calculated Asia tech exposure: %s", summarize(result))
             return result
         except Exception as e:
-            logger.error(f"Error calculating Asia tech exposure: {e}")
+            logger.error("Error calculating Asia tech exposure: %s", e)
             return {'exposure_percentage': 0, 'total_value': 0}
 
-    def get_earnings_surprises(self, symbols: List[str]) -> List[Dict]:
-        """Get earnings surprises for given symbols."""
+    def get_earnings_surprises(self, symbols: List[str], refresh: bool = False) -> List[Dict]:
+        """Get earnings surprises for given symbols, served from cache unless `refresh`."""
         surprises = []
         for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                earnings = ticker.earnings
-                if earnings is not None and not earnings.empty:
-                    latest = earnings.iloc[-1]
-                    expected = latest.get('Expected')
-                    actual = latest.get('Actual')
-                    if expected and actual:
-                        surprise_pct = ((actual - expected) / expected) * 100
-                        surprise = {
-                            'symbol': symbol,
-                            'surprise_percentage': surprise_pct,
-                            'actual': actual,
-                            'expected': expected
-                        }
-                        surprises.append(surprise)
-                        logger.info(f"Earnings surprise for {symbol}: {surprise}")
-            except Exception as e:
-                logger.error(f"Error fetching earnings data for {symbol}: {e}")
-                continue
-        return surprises
\ No newline at end of file
+            surprise = MISS if refresh else self.cache.get(('earnings', symbol))
+            if surprise is MISS:
+                try:
+                    surprise = self._fetch_earnings_surprise(symbol)
+                except UpstreamThrottled as e:
+                    logger.warning("Skipped earnings for %s: %s", symbol, e)
+                    raise
+                except Exception as e:
+                    _note_upstream_error(e)
+                    logger.error("Error fetching earnings data for %s: %s", symbol, e)
+                    continue
+                self.cache.set(('earnings', symbol), surprise)
+            if surprise is not None:
+                surprises.append(surprise)
+        return surprises
+
+    def _fetch_earnings_surprise(self, symbol: str) -> Optional[Dict]:
+        UPSTREAM_LIMITS.acquire(YAHOO_FINANCE)
+        with track_stage("fetcher.earnings.fetch"):
+            ticker = yf.Ticker(symbol)
+            earnings = ticker.earnings
+        if earnings is not None and not earnings.empty:
+            latest = earnings.iloc[-1]
+            expected = latest.get('Expected')
+            actual = latest.get('Actual')
+            if expected and actual:
+                surprise_pct = ((actual - expected) / expected) * 100
+                surprise = {
+                    'symbol': symbol,
+                    'surprise_percentage': surprise_pct,
+                    'actual': actual,
+                    'expected': expected
+                }
+                logger.info("Earnings surprise for %s: %s", symbol, summarize(surprise))
+                return surprise
+        return None
\ No newline at end of file
@@ -0,0 +1,146 @@
+import hashlib
+import importlib
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.metrics import track_stage
+
+logger = logging.getLogger("retriever_agent.embedder")
+
+# Keeps tickers and form types such as "005930.KS" or "10-K" as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+class Embedder(ABC):
+    """
+    Interface for text embedders used by the Retriever Agent. Implementations return one
+    L2-normalised float32 row per input text. Set EMBEDDER=package.module:ClassName to
+    plug in a heavier model; the class is constructed without arguments.
+    """
+    name = "base"
+    dimension = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """One L2-normalised float32 row per text, shape (len(texts), dimension)."""
+
+
+class HashingEmbedder(Embedder):
+    """
+    Dependency-free CPU embedder: signed feature hashing of word unigrams and bigrams with
+    sublinear term frequency. No model download or network access, and deterministic
+    across processes, so cached and stored vectors stay valid.
+    """
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                rows.append(row)
+                cols.append(h % self.dimension)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        counts = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)),
+                  np.asarray(signs, dtype=np.float32))
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors.astype(np.float32, copy=False)
+
+
+def load_embedder(spec: Optional[str] = None) -> Embedder:
+    """Instantiate the embedder named by `spec` / EMBEDDER, defaulting to HashingEmbedder."""
+    spec = spec or os.getenv("EMBEDDER")
+    if not spec:
+        return HashingEmbedder(int(os.getenv("EMBEDDING_DIMENSION", 768)))
+    module_name, _, class_name = spec.partition(":")
+    embedder = getattr(importlib.import_module(module_name), class_name)()
+    logger.info("Loaded embedder %s (dimension %s).", spec, embedder.dimension)
+    return embedder
+
+
+class EmbeddingService:
+    """
+    Embeds texts in micro-batches of `batch_size` and keeps an LRU cache keyed by a hash of
+    the embedder name and the text, so unchanged chunks are never re-embedded.
+    """
+    def __init__(self, embedder: Optional[Embedder] = None, batch_size: Optional[int] = None,
+                 cache_size: Optional[int] = None):
+        self.embedder = embedder or load_embedder()
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+        self.cache_size = cache_size or int(os.getenv("EMBEDDING_CACHE_SIZE", 100_000))
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.chunks_requested = 0
+        self.chunks_embedded = 0
+        self.cache_hits = 0
+        self.embed_seconds = 0.0
+
+    @property
+    def dimension(self) -> int:
+        return self.embedder.dimension
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.embedder.name}\0{text}".encode(), digest_size=16).digest()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        keys = [self._key(text) for text in texts]
+        result = np.empty((len(texts), self.dimension), dtype=np.float32)
+        missing: Dict[bytes, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._cache.get(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    result[i] = vector
+            self.chunks_requested += len(texts)
+            self.cache_hits += len(texts) - sum(len(v) for v in missing.values())
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            began = time.perf_counter()
+            with track_stage("retriever.embed_batch"):
+                vectors = self.embedder.embed([texts[positions[0]] for _, positions in batch])
+            elapsed = time.perf_counter() - began
+            with self._lock:
+                self.embed_seconds += elapsed
+                self.chunks_embedded += len(batch)
+                for (key, positions), vector in zip(batch, vectors):
+                    result[positions] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "embedder": self.embedder.name,
+            "dimension": self.dimension,
+            "batch_size": self.batch_size,
+            "chunks_requested": self.chunks_requested,
+            "chunks_embedded": self.chunks_embedded,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "embed_seconds": round(self.embed_seconds, 4),
+            "chunks_per_second": round(self.chunks_embedded / self.embed_seconds, 1) if self.embed_seconds else None,
+        }
@@ -0,0 +1,186 @@
+import bisect
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.metrics import track_stage
+
+logger = logging.getLogger("api_agent.exposure")
+
+DIMENSIONS = ("region", "sector", "currency")
+
+Selector = Optional[Union[str, Sequence[str]]]
+
+
+class ExposureCube:
+    """
+    Portfolio value aggregated along region x sector x currency. Built in one pass over
+    the positions: each dimension is factorized with np.unique and the values are summed
+    into the dense cube with a single np.bincount.
+    """
+    def __init__(self, labels: Dict[str, List[str]], values: np.ndarray):
+        self.labels = labels
+        self.values = values
+        self.total = float(values.sum())
+
+    @classmethod
+    def from_positions(cls, positions: List[Dict]) -> "ExposureCube":
+        with track_stage("exposure.build"):
+            if not positions:
+                return cls({dim: [] for dim in DIMENSIONS}, np.zeros((0, 0, 0)))
+            columns = list(zip(*(
+                (p.get('region') or 'Unknown', p.get('sector') or 'Unknown',
+                 p.get('currency') or 'Unknown', p.get('value', 0))
+                for p in positions
+            )))
+            labels, codes = {}, []
+            for dim, column in zip(DIMENSIONS, columns[:3]):
+                uniques, inverse = np.unique(np.asarray(column, dtype=str), return_inverse=True)
+                labels[dim] = uniques.tolist()
+                codes.append(inverse)
+            shape = tuple(len(labels[dim]) for dim in DIMENSIONS)
+            flat = np.ravel_multi_index(codes, shape)
+            values = np.bincount(flat, weights=np.asarray(columns[3], dtype=np.float64),
+                                 minlength=int(np.prod(shape))).reshape(shape)
+        return cls(labels, values)
+
+    def slice(self, region: Selector = None, sector: Selector = None, currency: Selector = None) -> float:
+        """Total value of the positions matching the selectors; None selects everything."""
+        masks = []
+        for dim, selector in zip(DIMENSIONS, (region, sector, currency)):
+            labels = np.asarray(self.labels[dim], dtype=str)
+            if selector is None:
+                masks.append(np.ones(len(labels), dtype=bool))
+            else:
+                selected = [selector] if isinstance(selector, str) else list(selector)
+                masks.append(np.isin(labels, selected))
+        if not all(mask.any() for mask in masks):
+            return 0.0
+        return float(self.values[np.ix_(*masks)].sum())
+
+    def to_npz(self, path: str):
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, values=self.values,
+                            **{dim: np.asarray(self.labels[dim], dtype=str) for dim in DIMENSIONS})
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_npz(cls, path: str) -> "ExposureCube":
+        with np.load(path) as data:
+            return cls({dim: data[dim].tolist() for dim in DIMENSIONS}, data["values"])
+
+
+class ExposureStore:
+    """
+    Daily exposure cube snapshots, one compressed .npz per date. Deltas are read from the
+    stored snapshots, so history is never recomputed from positions. "Previous day" is the
+    latest snapshot before the date, which skips weekends and holidays.
+    """
+    def __init__(self, root: Optional[str] = None, max_cached: int = 32):
+        self.root = root or os.getenv("EXPOSURE_STORE_DIR", os.path.join("data", "exposure"))
+        os.makedirs(self.root, exist_ok=True)
+        self._dates: List[date] = []
+        self._listed_version = None
+        self._cubes: "OrderedDict[date, Tuple[ExposureCube, int]]" = OrderedDict()
+        self._max_cached = max_cached
+        self._lock = threading.Lock()
+
+    def _refresh_dates(self):
+        """Re-list snapshots when the directory changed, e.g. saved by another worker process."""
+        stat = os.stat(self.root)
+        version = (stat.st_mtime_ns, stat.st_nlink)
+        if version != self._listed_version:
+            self._dates = sorted(
+                date.fromisoformat(name[:-4]) for name in os.listdir(self.root)
+                if name.endswith(".npz") and not name.endswith(".tmp.npz")
+            )
+            self._listed_version = version
+
+    def _path(self, as_of: date) -> str:
+        return os.path.join(self.root, f"{as_of.isoformat()}.npz")
+
+    def save(self, cube: ExposureCube, as_of: date):
+        path = self._path(as_of)
+        cube.to_npz(path)
+        with self._lock:
+            self._refresh_dates()
+            self._remember(as_of, cube, os.stat(path).st_ino)
+        logger.info("Saved exposure snapshot for %s.", as_of)
+
+    def _remember(self, as_of: date, cube: ExposureCube, inode: int):
+        self._cubes[as_of] = (cube, inode)
+        self._cubes.move_to_end(as_of)
+        while len(self._cubes) > self._max_cached:
+            self._cubes.popitem(last=False)
+
+    def load(self, as_of: date) -> Optional[ExposureCube]:
+        path = self._path(as_of)
+        with self._lock:
+            self._refresh_dates()
+            if as_of not in self._dates:
+                return None
+            # Snapshots are replaced atomically, so a new inode means another worker re-saved it
+            inode = os.stat(path).st_ino
+            cached = self._cubes.get(as_of)
+            if cached is not None and cached[1] == inode:
+                self._cubes.move_to_end(as_of)
+                return cached[0]
+        cube = ExposureCube.from_npz(path)
+        with self._lock:
+            self._remember(as_of, cube, inode)
+        return cube
+
+    def has(self, as_of: date) -> bool:
+        with self._lock:
+            self._refresh_dates()
+            return as_of in self._dates
+
+    def latest_on_or_before(self, as_of: date) -> Optional[date]:
+        with self._lock:
+            self._refresh_dates()
+            i = bisect.bisect_right(self._dates, as_of)
+            return self._dates[i - 1] if i else None
+
+    def snapshot_dates(self) -> List[date]:
+        with self._lock:
+            self._refresh_dates()
+            return list(self._dates)
+
+    def query(self, as_of: date, cube: Optional[ExposureCube] = None, **selectors) -> Dict:
+        """
+        Exposure of a slice on `as_of` (from `cube` if given, else the stored snapshot) with
+        day-over-day and week-over-week changes against earlier snapshots.
+        """
+        cube = cube or self.load(as_of)
+        if cube is None:
+            raise KeyError(f"No exposure snapshot for {as_of}")
+        result = _slice_summary(cube, as_of, selectors)
+        for name, reference in (("day_over_day", self.latest_on_or_before(as_of - timedelta(days=1))),
+                                ("week_over_week", self.latest_on_or_before(as_of - timedelta(days=7)))):
+            if reference is None:
+                result[name] = None
+                continue
+            previous = _slice_summary(self.load(reference), reference, selectors)
+            result[name] = {
+                'as_of': previous['as_of'],
+                'exposure_percentage': previous['exposure_percentage'],
+                'total_value': previous['total_value'],
+                'percentage_point_change': result['exposure_percentage'] - previous['exposure_percentage'],
+                'value_change': result['total_value'] - previous['total_value'],
+            }
+        return result
+
+
+def _slice_summary(cube: ExposureCube, as_of: date, selectors: Dict) -> Dict:
+    value = cube.slice(**selectors)
+    return {
+        'as_of': as_of.isoformat(),
+        'exposure_percentage': (value / cube.total * 100) if cube.total > 0 else 0,
+        'total_value': value,
+        'portfolio_value': cube.total,
+    }
@@ -0,0 +1,354 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+from utils.metrics import track_stage
+from utils.rate_limit import UpstreamThrottled
+
+logger = logging.getLogger("scraping_agent.filings_pipeline")
+
+# Called with each batch of {"text", "metadata"} chunks; must raise if the batch was not indexed
+Sink = Callable[[List[Dict]], None]
+
+WORD_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+MERSENNE_61 = (1 << 61) - 1
+
+
+def _fetch_with_backoff(fetch: Callable[[str], Optional[List[Dict]]], symbol: str,
+                        attempts: int = 3) -> Optional[List[Dict]]:
+    """Backfills are not latency sensitive, so wait out upstream rate limits instead of failing."""
+    for attempt in range(attempts):
+        try:
+            return fetch(symbol)
+        except UpstreamThrottled as e:
+            if attempt == attempts - 1:
+                return None
+            time.sleep(e.retry_after)
+
+
+def scrape(symbols: Iterable[str], fetch: Callable[[str], Optional[List[Dict]]],
+           skip: Callable[[str], bool] = lambda symbol: False) -> Iterator[Dict]:
+    """Yield raw filing rows symbol by symbol, then an end-of-symbol marker."""
+    for symbol in symbols:
+        symbol = symbol.strip().upper()
+        if not symbol or skip(symbol):
+            continue
+        filings = _fetch_with_backoff(fetch, symbol)
+        if filings is None:
+            logger.warning("Could not fetch filings for %s; it will be retried next run.", symbol)
+            continue
+        for filing in filings:
+            yield {"symbol": symbol, **filing}
+        yield {"symbol": symbol, "end_of_symbol": True}
+
+
+def normalize(rows: Iterable[Dict]) -> Iterator[Dict]:
+    """Unicode-normalise and collapse whitespace; drop rows without a description."""
+    for row in rows:
+        if row.get("end_of_symbol"):
+            yield row
+            continue
+        description = " ".join(unicodedata.normalize("NFKC", row.get("description", "")).split())
+        if description:
+            yield {
+                "symbol": row["symbol"],
+                "date": row.get("date", "").strip(),
+                "type": " ".join(row.get("type", "").split()).upper(),
+                "description": description,
+            }
+
+
+def chunk(filings: Iterable[Dict], max_words: int = 200, overlap: int = 40) -> Iterator[Dict]:
+    """Split descriptions into overlapping word windows prefixed with the filing header."""
+    step = max(1, max_words - overlap)
+    for filing in filings:
+        if filing.get("end_of_symbol"):
+            yield filing
+            continue
+        words = filing["description"].split()
+        header = f"{filing['symbol']} {filing['type']} {filing['date']}:"
+        for part, start in enumerate(range(0, max(1, len(words) - overlap), step)):
+            yield {
+                "text": f"{header} {' '.join(words[start:start + max_words])}",
+                "metadata": {"symbol": filing["symbol"], "date": filing["date"],
+                             "type": filing["type"], "chunk": part, "source": "filings"},
+            }
+
+
+class MinHasher:
+    """MinHash signatures over word 3-shingles, with (a * x + b) mod 2^61-1 permutations."""
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # Kept below 2^31 so products with 32-bit shingle hashes cannot overflow uint64
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = WORD_PATTERN.findall(text.lower())
+        shingles = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_61).min(axis=1)
+
+
+class Deduplicator:
+    """
+    Exact and near-duplicate detection backed by SQLite, so memory does not grow with the
+    size of the index. Exact duplicates are caught by a content hash before any MinHash
+    work. Near duplicates of the same symbol are found through LSH bands and confirmed
+    when the estimated Jaccard similarity reaches `threshold`.
+
+    Seen chunks are staged until `commit`, which runs once their batch is in the index, or
+    dropped by `rollback` if it never got there.
+    """
+    def __init__(self, conn: sqlite3.Connection, num_perm: int = 128, bands: int = 16,
+                 threshold: float = 0.8):
+        self.conn = conn
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._pending_hashes: Set[bytes] = set()
+        self._pending_signatures: Dict[bytes, np.ndarray] = {}
+        self._pending_bands: Dict[bytes, bytes] = {}
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (digest BLOB PRIMARY KEY, signature BLOB);
+            CREATE TABLE IF NOT EXISTS bands (band_key BLOB PRIMARY KEY, digest BLOB);
+        """)
+
+    def _band_keys(self, symbol: str, signature: np.ndarray) -> List[bytes]:
+        return [
+            hashlib.blake2b(symbol.encode() + bytes([band]) +
+                            signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                            digest_size=16).digest()
+            for band in range(self.bands)
+        ]
+
+    def _signature(self, digest: bytes) -> Optional[np.ndarray]:
+        if digest in self._pending_signatures:
+            return self._pending_signatures[digest]
+        row = self.conn.execute("SELECT signature FROM chunks WHERE digest = ?", (digest,)).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint64) if row else None
+
+    def check(self, text: str, symbol: str) -> Optional[str]:
+        """'exact' or 'near' if already seen, else None (and the chunk is staged as seen)."""
+        digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        if digest in self._pending_hashes or self.conn.execute(
+                "SELECT 1 FROM chunks WHERE digest = ?", (digest,)).fetchone():
+            return "exact"
+
+        signature = self.hasher.signature(text)
+        band_keys = self._band_keys(symbol, signature)
+        candidates = {self._pending_bands[key] for key in band_keys if key in self._pending_bands}
+        placeholders = ",".join("?" * len(band_keys))
+        candidates.update(row[0] for row in self.conn.execute(
+            f"SELECT digest FROM bands WHERE band_key IN ({placeholders})", band_keys))
+        for candidate in candidates:
+            other = self._signature(candidate)
+            if other is not None and np.mean(other == signature) >= self.threshold:
+                return "near"
+
+        self._pending_hashes.add(digest)
+        self._pending_signatures[digest] = signature
+        for key in band_keys:
+            self._pending_bands.setdefault(key, digest)
+        return None
+
+    def commit(self):
+        self.conn.executemany("INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+                              [(d, s.tobytes()) for d, s in self._pending_signatures.items()])
+        self.conn.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?)", self._pending_bands.items())
+        self.rollback()
+
+    def rollback(self):
+        """Forget staged chunks, so a retry checks them against committed ones only."""
+        self._pending_hashes.clear()
+        self._pending_signatures.clear()
+        self._pending_bands.clear()
+
+
+def dedup(chunks: Iterable[Dict], deduplicator: Deduplicator, stats: Dict) -> Iterator[Dict]:
+    for item in chunks:
+        if item.get("end_of_symbol"):
+            yield item
+            continue
+        with track_stage("filings_pipeline.dedup"):
+            duplicate = deduplicator.check(item["text"], item["metadata"]["symbol"])
+        if duplicate:
+            stats[f"{duplicate}_duplicates"] += 1
+        else:
+            yield item
+
+
+class FilingsPipeline:
+    """
+    Streaming filings ingestion: scrape -> normalize -> chunk -> dedup -> batched append.
+    Each stage is a generator, so at most one symbol's filings plus one batch of chunks
+    are in memory however many symbols are backfilled.
+
+    Progress is checkpointed in `state_dir`/filings.db. A symbol is marked done, and its
+    chunks marked seen, in the same transaction that follows a successful append. After
+    a crash, unfinished symbols are scraped again and their indexed chunks are skipped
+    by content hash.
+
+    The checkpoint describes one index. Pass the index's `index_id` and the state is
+    discarded when it changes (e.g. an in-memory retriever restarted empty), so chunks
+    are indexed again instead of being skipped as already seen.
+    """
+    def __init__(self, fetch: Callable[[str], Optional[List[Dict]]], sink: Sink,
+                 state_dir: Optional[str] = None, batch_size: int = 64, max_words: int = 200,
+                 overlap: int = 40, near_duplicate_threshold: float = 0.8,
+                 index_id: Optional[str] = None):
+        self.fetch = fetch
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_words = max_words
+        self.overlap = overlap
+        self.state_dir = state_dir or os.getenv("INGESTION_STATE_DIR", os.path.join("data", "ingestion"))
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.state_dir, "filings.db"), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS progress (symbol TEXT PRIMARY KEY, completed_at TEXT)")
+        self.deduplicator = Deduplicator(self.conn, threshold=near_duplicate_threshold)
+        if index_id is not None:
+            self._bind_index(index_id)
+
+    def _bind_index(self, index_id: str):
+        """Reset progress and dedup state if they were recorded against a different index."""
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'index_id'").fetchone()
+        if row and row[0] == index_id:
+            return
+        self.conn.execute("BEGIN")
+        if row:
+            logger.warning("Retriever index changed (%s -> %s); discarding ingestion checkpoints.",
+                           row[0], index_id)
+            for table in ("progress", "chunks", "bands"):
+                self.conn.execute(f"DELETE FROM {table}")
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('index_id', ?)", (index_id,))
+        self.conn.execute("COMMIT")
+
+    def is_done(self, symbol: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM progress WHERE symbol = ?", (symbol,)).fetchone() is not None
+
+    def _flush(self, batch: List[Dict], finished: List[str], stats: Dict):
+        if batch:
+            with track_stage("filings_pipeline.append"):
+                self.sink(batch)
+        now = datetime.now().isoformat()
+        self.conn.execute("BEGIN")
+        try:
+            self.deduplicator.commit()
+            self.conn.executemany("INSERT OR REPLACE INTO progress VALUES (?, ?)",
+                                  [(symbol, now) for symbol in finished])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        stats["indexed"] += len(batch)
+        stats["symbols_completed"] += len(finished)
+        logger.info("Indexed %s chunk(s); %s symbol(s) completed so far.",
+                    stats["indexed"], stats["symbols_completed"])
+
+    def run(self, symbols: Iterable[str], resume: bool = True) -> Dict:
+        stats = {"symbols_completed": 0, "filings": 0, "chunks": 0, "exact_duplicates": 0,
+                 "near_duplicates": 0, "indexed": 0}
+
+        def counted(items: Iterable[Dict], key: str) -> Iterator[Dict]:
+            for item in items:
+                stats[key] += not item.get("end_of_symbol")
+                yield item
+
+        skip = self.is_done if resume else (lambda symbol: False)
+        stream = counted(normalize(scrape(symbols, self.fetch, skip)), "filings")
+        stream = counted(chunk(stream, self.max_words, self.overlap), "chunks")
+        batch: List[Dict] = []
+        finished: List[str] = []
+        try:
+            for item in dedup(stream, self.deduplicator, stats):
+                if item.get("end_of_symbol"):
+                    finished.append(item["symbol"])
+                    if not batch:
+                        # Nothing new for this symbol; checkpoint without waiting for a batch
+                        self._flush(batch, finished, stats)
+                        finished = []
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, finished, stats)
+                    batch, finished = [], []
+            self._flush(batch, finished, stats)
+        except Exception:
+            # Staged chunks never reached the index (e.g. the sink failed); a retry must send them
+            self.deduplicator.rollback()
+            raise
+        return stats
+
+    def close(self):
+        self.conn.close()
+
+
+class RetrieverSink:
+    """Appends chunk batches to the Retriever Agent through `/add-texts`."""
+    def __init__(self, url: Optional[str] = None, timeout: float = 60.0):
+        import httpx
+        self.url = (url or os.getenv("RETRIEVER_URL", "http://localhost:8004")).rstrip("/")
+        self.client = httpx.Client(timeout=timeout)
+
+    def __call__(self, batch: List[Dict]):
+        self.client.post(f"{self.url}/add-texts", json=batch).raise_for_status()
+
+    def index_id(self) -> str:
+        """Identity of the retriever's text index; changes whenever it starts out empty."""
+        response = self.client.get(f"{self.url}/info", params={"store": "texts"})
+        response.raise_for_status()
+        return response.json()["index_id"]
+
+
+def _read_symbols(args) -> Iterator[str]:
+    yield from args.symbols
+    if args.symbols_file:
+        with open(args.symbols_file) as f:
+            for line in f:  # streamed, so large symbol lists are never loaded at once
+                yield line.split("#")[0]
+
+
+def main(argv: List[str] = None):
+    from data_ingestion.scraper import FinancialScraper
+
+    parser = argparse.ArgumentParser(description="Scrape, deduplicate and index company filings.")
+    parser.add_argument("symbols", nargs="*")
+    parser.add_argument("--symbols-file", help="File with one symbol per line")
+    parser.add_argument("--retriever-url", help="Retriever Agent URL (default $RETRIEVER_URL or :8004)")
+    parser.add_argument("--state-dir", help="Checkpoint directory (default $INGESTION_STATE_DIR or data/ingestion)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--no-resume", action="store_true", help="Re-scrape symbols that already completed")
+    args = parser.parse_args(argv)
+    if not args.symbols and not args.symbols_file:
+        parser.error("Pass symbols or --symbols-file")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    sink = RetrieverSink(args.retriever_url)
+    pipeline = FilingsPipeline(FinancialScraper().fetch_company_filings, sink, state_dir=args.state_dir,
+                               batch_size=args.batch_size, index_id=sink.index_id())
+    try:
+        stats = pipeline.run(_read_symbols(args), resume=not args.no_resume)
+    finally:
+        pipeline.close()
+    print(json.dumps(stats, indent=2))
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import math
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from data_ingestion.embedder import TOKEN_PATTERN
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring, appended to incrementally alongside the FAISS
+    index so document ids line up with vector positions. Each term's postings are two
+    `array.array` columns (doc ids as uint32, term frequencies as uint16), viewed as numpy
+    arrays at query time without copying.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self._doc_ids: List[array] = []
+        self._freqs: List[array] = []
+        self._lengths = array("I")
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, texts: List[str]):
+        for text in texts:
+            doc_id = len(self._lengths)
+            counts = Counter(tokenize(text))
+            for term, freq in counts.items():
+                term_id = self.vocabulary.get(term)
+                if term_id is None:
+                    term_id = self.vocabulary[term] = len(self._doc_ids)
+                    self._doc_ids.append(array("I"))
+                    self._freqs.append(array("H"))
+                self._doc_ids[term_id].append(doc_id)
+                self._freqs[term_id].append(min(freq, 0xFFFF))
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+
+    def search(self, query: str, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and BM25 scores of the best `top_k` documents matching any query term."""
+        n = len(self._lengths)
+        term_ids = [self.vocabulary[t] for t in set(tokenize(query)) if t in self.vocabulary]
+        if not n or not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / n))
+        scores = np.zeros(n, dtype=np.float32)
+        for term_id in term_ids:
+            ids = np.frombuffer(self._doc_ids[term_id], dtype=np.uint32)
+            freqs = np.frombuffer(self._freqs[term_id], dtype=np.uint16).astype(np.float32)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            # A term appears once per document in its postings, so fancy-index += is safe
+            scores[ids] += idf * freqs * (self.k1 + 1) / (freqs + norm[ids])
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(scores[matched], -top_k)[-top_k:]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return order, scores[order]
+
+    def stats(self) -> Dict:
+        postings = sum(len(ids) for ids in self._doc_ids)
+        return {
+            "documents": len(self._lengths),
+            "terms": len(self.vocabulary),
+            "postings": postings,
+            "postings_bytes": postings * 6 + len(self._lengths) * 4,
+        }
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists by summing 1 / (k + rank); returns (id, score) best first."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
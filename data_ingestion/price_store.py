@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.file_lock import FileLock
+from utils.lazy import lazy_import
+from utils.metrics import track_stage
+from utils.rate_limit import UPSTREAM_LIMITS, YAHOO_FINANCE
+
+logger = logging.getLogger("api_agent.price_store")
+
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+_GENERATION_MARKER = re.compile(r"gen-(\d+)\.done")
+
+# (symbol, start, end exclusive) -> DataFrame indexed by date with Open/High/Low/Close/Volume
+Fetcher = Callable[[str, date, date], "pd.DataFrame"]
+
+
+def yahoo_history(symbol: str, start: date, end: date) -> "pd.DataFrame":
+    """Daily OHLCV bars for [start, end) from Yahoo Finance, split/dividend adjusted."""
+    UPSTREAM_LIMITS.acquire(YAHOO_FINANCE)
+    return yf.Ticker(symbol).history(start=start.isoformat(), end=end.isoformat(), auto_adjust=True)
+
+
+def _to_day(value) -> np.datetime64:
+    return np.datetime64(value, "D")
+
+
+def missing_ranges(coverage: List[Tuple[date, date]], start: date, end: date) -> List[Tuple[date, date]]:
+    """Sub-ranges of [start, end] (inclusive) not covered by the sorted, merged `coverage`."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in coverage:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, min(end, covered_start - timedelta(days=1))))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_ranges(ranges: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    merged: List[Tuple[date, date]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PriceStore:
+    """
+    Local columnar store of daily OHLCV bars, one directory per symbol holding a `.npy`
+    file per column (dates as datetime64[D]) plus the calendar ranges already fetched.
+    Each write adds a new generation of column files, published by a `gen-N.done` marker.
+
+    Reads memory-map the column files, so slicing a range touches only the pages it needs.
+    `ensure_range` downloads only the parts of a requested range that were never fetched,
+    including weekends and holidays, so gaps are not re-requested. Today's bar is still
+    changing and a gap with business days may come back empty (unknown symbol, throttling),
+    so both are only covered provisionally, for `recheck_after`, before being fetched again.
+    """
+    def __init__(self, root: Optional[str] = None, fetch: Fetcher = yahoo_history,
+                 recheck_after: timedelta = timedelta(minutes=15)):
+        self.root = root or os.getenv("PRICE_STORE_DIR", os.path.join("data", "prices"))
+        self.fetch = fetch
+        self.recheck_after = recheck_after
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._^-]", "_", symbol.upper()))
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def _coverage(self, symbol: str) -> Tuple[List[Tuple[date, date]], List[Tuple[date, date, datetime]]]:
+        """Ranges fetched for good, and provisional ranges with their fetch time that are still fresh."""
+        path = os.path.join(self._symbol_dir(symbol), "coverage.json")
+        if not os.path.exists(path):
+            return [], []
+        with open(path) as f:
+            stored = json.load(f)
+        if isinstance(stored, list):  # layout before provisional ranges
+            stored = {"ranges": stored, "provisional": []}
+        ranges = [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in stored["ranges"]]
+        now = datetime.now()
+        provisional = [(date.fromisoformat(s), date.fromisoformat(e), datetime.fromisoformat(t))
+                       for s, e, t in stored.get("provisional", [])]
+        return ranges, [p for p in provisional if now - p[2] < self.recheck_after]
+
+    def _write_coverage(self, symbol: str, ranges: List[Tuple[date, date]],
+                        provisional: List[Tuple[date, date, datetime]]):
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, "coverage.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"ranges": [[s.isoformat(), e.isoformat()] for s, e in ranges],
+                       "provisional": [[s.isoformat(), e.isoformat(), t.isoformat()]
+                                       for s, e, t in provisional]}, f)
+        os.replace(tmp, os.path.join(directory, "coverage.json"))
+
+    @staticmethod
+    def _generations(directory: str) -> List[int]:
+        """Committed column generations in `directory`, oldest first; 0 is the unnumbered layout."""
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        generations = sorted(int(m.group(1)) for m in map(_GENERATION_MARKER.fullmatch, names) if m)
+        if "date.npy" in names:
+            generations.insert(0, 0)
+        return generations
+
+    @staticmethod
+    def _column_path(directory: str, name: str, generation: int) -> str:
+        return os.path.join(directory, f"{name}.npy" if generation == 0 else f"{name}.{generation}.npy")
+
+    def _load_columns(self, symbol: str) -> Optional[Dict[str, np.ndarray]]:
+        directory = self._symbol_dir(symbol)
+        for attempt in range(3):
+            generations = self._generations(directory)
+            if not generations:
+                return None
+            try:
+                return {
+                    name: np.load(self._column_path(directory, name, generations[-1]), mmap_mode="r")
+                    for name in ("date",) + COLUMNS
+                }
+            except FileNotFoundError:
+                # A writer published a newer generation and removed this one; look again
+                if attempt == 2:
+                    raise
+
+    def _write(self, symbol: str, columns: Dict[str, np.ndarray]):
+        """
+        Write the columns as a new generation instead of replacing files in place: readers
+        may still have the old ones memory-mapped, and Windows refuses to replace or delete
+        a mapped file. Old generations are removed once nobody maps them.
+        """
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        previous = self._generations(directory)
+        generation = (previous[-1] if previous else 0) + 1
+        for name, values in columns.items():
+            with open(self._column_path(directory, name, generation), "wb") as f:
+                np.save(f, values)
+                f.flush()
+                os.fsync(f.fileno())
+        # Creating the marker publishes the generation to readers
+        open(os.path.join(directory, f"gen-{generation}.done"), "wb").close()
+        for old in previous:
+            paths = [self._column_path(directory, name, old) for name in ("date",) + COLUMNS]
+            if old:
+                paths.append(os.path.join(directory, f"gen-{old}.done"))
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    break  # still mapped somewhere (Windows); retried on the next write
+
+    @staticmethod
+    def _frame_to_columns(frame: "pd.DataFrame") -> Dict[str, np.ndarray]:
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        columns = {"date": index.values.astype("datetime64[D]")}
+        for name in COLUMNS:
+            columns[name] = frame[name.capitalize()].to_numpy(dtype=np.float64)
+        return columns
+
+    def ensure_range(self, symbol: str, start: date, end: date) -> int:
+        """Fetch whatever part of [start, end] is not stored yet; returns the number of new bars."""
+        today = date.today()
+        end = min(end, today)
+        if start > end:
+            return 0
+        # Thread lock for this process, file lock for other worker processes sharing the store
+        with self._lock(symbol), FileLock(self._symbol_dir(symbol) + ".lock"):
+            ranges, provisional = self._coverage(symbol)
+            gaps = missing_ranges(merge_ranges(ranges + [(s, e) for s, e, _ in provisional]), start, end)
+            if not gaps:
+                return 0
+
+            fetched = []
+            filled = []
+            now = datetime.now()
+            for gap_start, gap_end in gaps:
+                with track_stage("price_store.fetch"):
+                    frame = self.fetch(symbol, gap_start, gap_end + timedelta(days=1))
+                if frame is not None and not frame.empty:
+                    fetched.append(self._frame_to_columns(frame))
+                    filled.append((gap_start, gap_end))
+                elif not np.busday_count(gap_start, gap_end + timedelta(days=1)):
+                    # Weekend-only gap: no bars expected, so nothing to retry
+                    filled.append((gap_start, gap_end))
+                else:
+                    # Unknown symbol, or yfinance throttled: it returns an empty frame for both
+                    logger.warning("No bars for %s between %s and %s; will retry in %s.",
+                                   symbol, gap_start, gap_end, self.recheck_after)
+                    provisional.append((gap_start, gap_end, now))
+            logger.info("Fetched %s gap(s) for %s between %s and %s.", len(gaps), symbol, start, end)
+
+            # Today's bar is provisional, so cover it only until it is worth refreshing
+            for s, e in filled:
+                if e >= today:
+                    provisional.append((max(s, today), e, now))
+            ranges = merge_ranges(ranges + [(s, min(e, today - timedelta(days=1)))
+                                            for s, e in filled if s < today])
+
+            existing = self._load_columns(symbol)
+            parts = ([{k: np.asarray(v) for k, v in existing.items()}] if existing else []) + fetched
+            if fetched:
+                merged = {name: np.concatenate([p[name] for p in parts]) for name in ("date",) + COLUMNS}
+                # Later parts win on duplicate dates (e.g. today's bar re-fetched)
+                order = np.argsort(merged["date"], kind="stable")
+                dates = merged["date"][order]
+                keep = np.append(dates[1:] != dates[:-1], True)
+                columns = {name: values[order][keep] for name, values in merged.items()}
+                if existing is None or any(not np.array_equal(columns[name], existing[name])
+                                           for name in columns):
+                    self._write(symbol, columns)
+            self._write_coverage(symbol, ranges, provisional)
+            return sum(len(part["date"]) for part in fetched)
+
+    def read(self, symbol: str, start: date, end: date, fetch_missing: bool = True) -> Dict[str, np.ndarray]:
+        """Columns for bars in [start, end], as slices of the memory-mapped files."""
+        if fetch_missing:
+            self.ensure_range(symbol, start, end)
+        columns = self._load_columns(symbol)
+        if columns is None:
+            return {name: np.array([]) for name in ("date",) + COLUMNS}
+        dates = columns["date"]
+        lo = np.searchsorted(dates, _to_day(start), side="left")
+        hi = np.searchsorted(dates, _to_day(end), side="right")
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def returns_matrix(self, symbols: List[str], start: date, end: date, column: str = "close",
+                       log: bool = False, join: str = "inner") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Daily returns for many symbols aligned on a common date axis.
+        Returns (dates[T], returns[T, N]); with join="outer", missing bars are NaN.
+        """
+        series = [self.read(symbol, start, end) for symbol in symbols]
+        if not series:
+            return np.array([], dtype="datetime64[D]"), np.empty((0, 0))
+        with track_stage("price_store.align"):
+            all_dates = np.unique(np.concatenate([s["date"] for s in series]))
+            prices = np.full((len(all_dates), len(symbols)), np.nan)
+            for j, s in enumerate(series):
+                prices[np.searchsorted(all_dates, s["date"]), j] = s[column]
+            if join == "inner":
+                complete = ~np.isnan(prices).any(axis=1)
+                all_dates, prices = all_dates[complete], prices[complete]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if log:
+                    returns = np.diff(np.log(prices), axis=0)
+                else:
+                    returns = prices[1:] / prices[:-1] - 1.0
+        return all_dates[1:], returns
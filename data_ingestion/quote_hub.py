@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("api_agent.quote_hub")
+
+# Fields that change on every fetch and are not worth a push on their own
+VOLATILE_FIELDS = ("timestamp",)
+
+
+class QuoteSubscriber:
+    """
+    One client's symbol set plus the quote fields that changed since its last send. Updates
+    for the same symbol are merged while the client is busy, so a slow client gets the
+    latest value of every field in one message instead of a growing backlog. Replies to the
+    client's own requests are queued here too, so a single task does all the sending.
+    """
+    def __init__(self):
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, Dict] = {}
+        self._replies: List[Dict] = []
+        self._ready = asyncio.Event()
+
+    def push(self, symbol: str, fields: Dict):
+        self._pending.setdefault(symbol, {}).update(fields)
+        self._ready.set()
+
+    def reply(self, message: Dict):
+        self._replies.append(message)
+        self._ready.set()
+
+    async def next_messages(self) -> List[Dict]:
+        """Wait for replies or changes and return them in send order, changes as one "quotes" message."""
+        await self._ready.wait()
+        self._ready.clear()
+        messages, self._replies = self._replies, []
+        updates, self._pending = self._pending, {}
+        if updates:
+            messages.append({"type": "quotes", "quotes": updates})
+        return messages
+
+    async def next_updates(self) -> Dict[str, Dict]:
+        """Wait for changes and return them as {symbol: {field: value}}."""
+        await self._ready.wait()
+        self._ready.clear()
+        updates, self._pending = self._pending, {}
+        return updates
+
+
+class _SymbolFeed:
+    __slots__ = ("subscribers", "quote", "task")
+
+    def __init__(self):
+        self.subscribers: Set[QuoteSubscriber] = set()
+        self.quote: Optional[Dict] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class QuoteHub:
+    """
+    Fans quote updates out to WebSocket subscribers. Each subscribed symbol has a single
+    poller that calls `fetch` every `interval` seconds while anyone follows it, and only
+    fields that changed are pushed. Upstream load therefore grows with the number of
+    distinct symbols, not with the number of clients.
+    """
+    def __init__(self, fetch: Callable[[str], Optional[Dict]], interval: float = 5.0):
+        self.fetch = fetch
+        self.interval = interval
+        self.polls = 0
+        self.updates = 0
+        self._feeds: Dict[str, _SymbolFeed] = {}
+
+    def subscribe(self, subscriber: QuoteSubscriber, symbols: Iterable[str]) -> List[str]:
+        """Follow `symbols`; the last known quote of each is pushed right away. Returns new symbols."""
+        added = []
+        for symbol in symbols:
+            if symbol in subscriber.symbols:
+                continue
+            feed = self._feeds.get(symbol)
+            if feed is None:
+                feed = self._feeds[symbol] = _SymbolFeed()
+            feed.subscribers.add(subscriber)
+            subscriber.symbols.add(symbol)
+            if feed.quote is not None:
+                subscriber.push(symbol, feed.quote)
+            if feed.task is None:
+                feed.task = asyncio.get_running_loop().create_task(self._poll(symbol, feed))
+            added.append(symbol)
+        return added
+
+    def unsubscribe(self, subscriber: QuoteSubscriber, symbols: Optional[Iterable[str]] = None):
+        """Stop following `symbols` (all of them by default); idle pollers stop after their next tick."""
+        for symbol in list(subscriber.symbols if symbols is None else symbols):
+            subscriber.symbols.discard(symbol)
+            feed = self._feeds.get(symbol)
+            if feed is not None:
+                feed.subscribers.discard(subscriber)
+
+    def publish(self, symbol: str, quote: Dict) -> Dict:
+        """Push the fields of `quote` that differ from the last one; returns what was pushed."""
+        feed = self._feeds.get(symbol)
+        if feed is None:
+            return {}
+        previous = feed.quote or {}
+        changed = {k: v for k, v in quote.items()
+                   if k not in VOLATILE_FIELDS and (k not in previous or previous[k] != v)}
+        feed.quote = quote
+        if not changed:
+            return {}
+        changed.update({k: quote[k] for k in VOLATILE_FIELDS if k in quote})
+        for subscriber in feed.subscribers:
+            subscriber.push(symbol, changed)
+        self.updates += 1
+        return changed
+
+    async def _poll(self, symbol: str, feed: _SymbolFeed):
+        while feed.subscribers:
+            try:
+                quote = await asyncio.to_thread(self.fetch, symbol)
+                self.polls += 1
+                if quote is not None:
+                    self.publish(symbol, quote)
+            except Exception as e:
+                logger.warning("Quote poll for %s failed: %s", symbol, e)
+            await asyncio.sleep(self.interval)
+        # Nobody resubscribed while we slept, so the feed can go
+        feed.task = None
+        if self._feeds.get(symbol) is feed:
+            del self._feeds[symbol]
+        logger.info("Stopped polling %s: no subscribers left.", symbol)
+
+    async def stop(self):
+        tasks = [feed.task for feed in self._feeds.values() if feed.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._feeds.clear()
+
+    def stats(self) -> Dict:
+        subscribers = set().union(*(feed.subscribers for feed in self._feeds.values()))
+        return {
+            "symbols": {symbol: len(feed.subscribers) for symbol, feed in self._feeds.items()},
+            "subscribers": len(subscribers),
+            "interval_seconds": self.interval,
+            "polls": self.polls,
+            "updates": self.updates,
+        }
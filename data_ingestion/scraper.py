@@ -1,15 +1,93 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 import logging
+import os
+import re
+from utils.cache import MISS, make_cache
+from utils.lazy import lazy_import
+from utils.logging_setup import summarize
+from utils.metrics import track_stage
+from utils.rate_limit import UPSTREAM_LIMITS, UpstreamThrottled
 
 logger = logging.getLogger("scraping_agent.scraper")
 
+bs4 = lazy_import("bs4")
+requests = lazy_import("requests")
+
+# Yahoo world indices: ticker, region and the names the index is listed under. Names are
+# matched exactly (case, spacing and punctuation aside), never by prefix, so e.g.
+# "FTSE Bursa Malaysia KLCI" is not taken for a UK index. Asia covers Asia-Pacific.
+INDEX_REGIONS = (
+    ("^N225", "Asia", ("Nikkei 225",)),
+    ("^HSI", "Asia", ("Hang Seng Index",)),
+    ("000001.SS", "Asia", ("SSE Composite Index",)),
+    ("399001.SZ", "Asia", ("Shenzhen Index", "Shenzhen Component")),
+    ("^KS11", "Asia", ("KOSPI Composite Index",)),
+    ("^TWII", "Asia", ("TWSE Capitalization Weighted",)),
+    ("^STI", "Asia", ("STI Index",)),
+    ("^KLSE", "Asia", ("FTSE Bursa Malaysia KLCI",)),
+    ("^JKSE", "Asia", ("IDX Composite",)),
+    ("^BSESN", "Asia", ("S&P BSE SENSEX",)),
+    ("^NSEI", "Asia", ("NIFTY 50",)),
+    ("^AXJO", "Asia", ("S&P/ASX 200",)),
+    ("^AORD", "Asia", ("All Ordinaries",)),
+    ("^NZ50", "Asia", ("S&P/NZX 50 Index Gross",)),
+    ("^GSPC", "Americas", ("S&P 500",)),
+    ("^DJI", "Americas", ("Dow Jones Industrial Average", "Dow 30")),
+    ("^IXIC", "Americas", ("NASDAQ Composite",)),
+    ("^NYA", "Americas", ("NYSE Composite (DJ)",)),
+    ("^XAX", "Americas", ("NYSE AMEX Composite Index",)),
+    ("^RUT", "Americas", ("Russell 2000",)),
+    ("^GSPTSE", "Americas", ("S&P/TSX Composite Index",)),
+    ("^BVSP", "Americas", ("IBOVESPA",)),
+    ("^MXX", "Americas", ("IPC Mexico",)),
+    ("^IPSA", "Americas", ("S&P IPSA",)),
+    ("^MERV", "Americas", ("MERVAL",)),
+    ("^FTSE", "Europe", ("FTSE 100",)),
+    ("^BUK100P", "Europe", ("Cboe UK 100",)),
+    ("^GDAXI", "Europe", ("DAX Performance Index",)),
+    ("^FCHI", "Europe", ("CAC 40",)),
+    ("^STOXX50E", "Europe", ("Euro Stoxx 50", "ESTX 50 PR.EUR")),
+    ("^N100", "Europe", ("Euronext 100 Index",)),
+    ("^BFX", "Europe", ("BEL 20",)),
+    ("^IBEX", "Europe", ("IBEX 35",)),
+    ("^AEX", "Europe", ("AEX-Index",)),
+    ("^SSMI", "Europe", ("SMI PR",)),
+    ("IMOEX.ME", "Europe", ("MOEX Russia Index",)),
+    ("^TA125.TA", "Middle East & Africa", ("TA-125",)),
+    ("^CASE30", "Middle East & Africa", ("EGX 30 Price Return Index",)),
+    ("^JN0U.JO", "Middle East & Africa", ("Top 40 USD Net TRI Index",)),
+)
+REGION_ALIASES = {"asia": ("Asia",), "apac": ("Asia",), "asia-pacific": ("Asia",),
+                  "americas": ("Americas",), "us": ("Americas",), "north america": ("Americas",),
+                  "europe": ("Europe",), "middle east & africa": ("Middle East & Africa",),
+                  "mea": ("Middle East & Africa",), "emea": ("Europe", "Middle East & Africa")}
+
+def _index_key(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+_REGION_BY_TICKER = {ticker: region for ticker, region, _ in INDEX_REGIONS}
+_REGION_BY_NAME = {_index_key(name): region for _, region, names in INDEX_REGIONS for name in names}
+
+def index_region(name: str, symbol: Optional[str] = None) -> Optional[str]:
+    """Region of a world index by Yahoo ticker or exact name, or None if it is not one we know."""
+    region = _REGION_BY_TICKER.get(symbol.strip().upper()) if symbol else None
+    return region or _REGION_BY_NAME.get(_index_key(name))
+
+def _retry_after(value: Optional[str], default: float = 60.0) -> float:
+    """Seconds from a Retry-After header given as delta-seconds; `default` otherwise."""
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
 class FinancialScraper:
     """
     Scrapes financial data, filings, market sentiment, and yield data for the Scraping Agent.
-    Includes error handling and logging for all operations.
+    Includes caching, error handling and logging for all operations; only successfully
+    fetched pages populate the cache.
     """
     def __init__(self):
         self.headers = {
@@ -19,52 +97,122 @@ class FinancialScraper:
             'yahoo_finance': 'https://finance.yahoo.com',
             'market_watch': 'https://www.marketwatch.com'
         }
+        self.cache_duration = timedelta(minutes=15)
+        self.cache = make_cache(self.cache_duration, "scraping_agent")
+        self.timeout = float(os.getenv("SCRAPER_TIMEOUT", 10))
+        self.max_concurrency = int(os.getenv("SCRAPER_CONCURRENCY", 4))
 
-    def _make_request(self, url: str) -> Optional[str]:
+    def _make_request(self, url: str, stage: str = "scraper.fetch") -> Optional[str]:
+        host = urlsplit(url).hostname
+        try:
+            UPSTREAM_LIMITS.acquire(host)
+        except UpstreamThrottled as e:
+            # Not a failed fetch: let the endpoint shed the request with Retry-After
+            logger.warning("Skipped %s: %s", url, e)
+            raise
         try:
-            response = requests.get(url, headers=self.headers)
+            with track_stage(stage):
+                response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            if response.status_code == 429:
+                UPSTREAM_LIMITS.throttle(host, _retry_after(response.headers.get("Retry-After")))
             response.raise_for_status()
-            logger.info(f"Fetched URL: {url}")
+            logger.info("Fetched URL: %s", url)
             return response.text
         except Exception as e:
-            logger.error(f"Error fetching {url}: {e}")
+            logger.error("Error fetching %s: %s", url, e)
             return None
 
-    def get_market_sentiment(self, region: str = 'Asia') -> Dict:
-        """Scrape market sentiment indicators."""
-        sentiment_data = {
-            'sentiment': 'neutral',
-            'indicators': [],
-            'timestamp': datetime.now().isoformat()
-        }
-        url = f"{self.base_urls['yahoo_finance']}/world-indices"
-        html = self._make_request(url)
-        if html:
-            soup = BeautifulSoup(html, 'html.parser')
+    def _fetch_all(self, urls: Dict[str, str], stage: str) -> Dict[str, Optional[str]]:
+        """Fetch distinct pages concurrently, at most `max_concurrency` at a time."""
+        if len(urls) <= 1:
+            return {key: self._make_request(url, stage=stage) for key, url in urls.items()}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(urls))) as pool:
+            pages = pool.map(lambda url: self._make_request(url, stage=stage), urls.values())
+            return dict(zip(urls, pages))
+
+    def _parse_world_indices(self, html: str) -> List[Dict]:
+        indicators = []
+        with track_stage("scraper.world_indices.parse"):
+            soup = bs4.BeautifulSoup(html, 'html.parser')
             market_summary = soup.find('div', {'id': 'market-summary'})
             if market_summary:
-                indicators = market_summary.find_all('tr')
-                for indicator in indicators:
+                for indicator in market_summary.find_all('tr'):
                     try:
                         name = indicator.find('td', {'class': 'name'}).text.strip()
                         change = indicator.find('td', {'class': 'change'}).text.strip()
-                        sentiment_data['indicators'].append({
-                            'name': name,
-                            'change': change
-                        })
+                        symbol = indicator.find('td', {'class': 'symbol'})
+                        region = index_region(name, symbol.text if symbol else None)
+                        if region is None:
+                            logger.debug("No region for world index %r; only unscoped requests get it.", name)
+                        indicators.append({'name': name, 'change': change, 'region': region})
                     except Exception as e:
-                        logger.warning(f"Error parsing indicator: {e}")
+                        logger.warning("Error parsing indicator: %s", e)
                         continue
-        logger.info(f"Market sentiment scraped: {sentiment_data}")
-        return sentiment_data
+        return indicators
+
+    def get_market_sentiment(self, region: str = 'Asia', refresh: bool = False) -> Dict:
+        """Scrape market sentiment indicators for a region, served from cache unless `refresh`."""
+        return self.get_market_sentiments([region], refresh=refresh)[region]
+
+    def get_market_sentiments(self, regions: Iterable[str], refresh: bool = False) -> Dict[str, Dict]:
+        """
+        Sentiment for several regions, split by index region from one parsed copy of the
+        world-indices page (cached unless `refresh`). Regions we cannot map (e.g. "Global")
+        get every indicator.
+        """
+        page = MISS if refresh else self.cache.get(('world_indices',))
+        if page is MISS:
+            url = f"{self.base_urls['yahoo_finance']}/world-indices"
+            html = self._make_request(url, stage="scraper.world_indices.fetch")
+            page = {'indicators': self._parse_world_indices(html) if html else [],
+                    'timestamp': datetime.now().isoformat()}
+            if html:
+                self.cache.set(('world_indices',), page)
+            logger.info("World indices scraped: %s", summarize(page))
 
-    def get_company_filings(self, symbol: str) -> List[Dict]:
-        """Get recent company filings."""
+        results = {}
+        for region in regions:
+            wanted = REGION_ALIASES.get(region.lower())
+            results[region] = {
+                'sentiment': 'neutral',
+                'indicators': [{'name': i['name'], 'change': i['change']} for i in page['indicators']
+                               if wanted is None or i['region'] in wanted],
+                'timestamp': page['timestamp']
+            }
+        return results
+
+    def get_company_filings(self, symbol: str, refresh: bool = False) -> List[Dict]:
+        """Get recent company filings, served from cache unless `refresh`."""
+        return self.get_company_filings_batch([symbol], refresh=refresh)[symbol]
+
+    def get_company_filings_batch(self, symbols: Iterable[str], refresh: bool = False) -> Dict[str, List[Dict]]:
+        """Filings for several symbols; pages not in cache are fetched concurrently."""
+        results = {}
+        for symbol in dict.fromkeys(symbols):
+            cached = MISS if refresh else self.cache.get(('filings', symbol))
+            if cached is not MISS:
+                results[symbol] = cached
+        urls = {symbol: self._filings_url(symbol) for symbol in dict.fromkeys(symbols) if symbol not in results}
+        for symbol, html in self._fetch_all(urls, stage="scraper.filings.fetch").items():
+            filings = self._parse_filings(html) if html else None
+            if filings is not None:
+                self.cache.set(('filings', symbol), filings)
+            logger.info("Company filings scraped for %s: %s", symbol, summarize(filings))
+            results[symbol] = filings or []
+        return results
+
+    def _filings_url(self, symbol: str) -> str:
+        return f"{self.base_urls['market_watch']}/investing/stock/{symbol}/financials"
+
+    def fetch_company_filings(self, symbol: str) -> Optional[List[Dict]]:
+        """Scrape filings without touching the cache; None if the page could not be fetched."""
+        html = self._make_request(self._filings_url(symbol), stage="scraper.filings.fetch")
+        return self._parse_filings(html) if html else None
+
+    def _parse_filings(self, html: str) -> List[Dict]:
         filings = []
-        url = f"{self.base_urls['market_watch']}/investing/stock/{symbol}/financials"
-        html = self._make_request(url)
-        if html:
-            soup = BeautifulSoup(html, 'html.parser')
+        with track_stage("scraper.filings.parse"):
+            soup = bs4.BeautifulSoup(html, 'html.parser')
             filing_tables = soup.find_all('table', {'class': 'filing'})
             for table in filing_tables:
                 rows = table.find_all('tr')
@@ -77,33 +225,37 @@ class FinancialScraper:
                             'description': cols[2].text.strip()
                         })
                     except Exception as e:
-                        logger.warning(f"Error parsing filing row: {e}")
+                        logger.warning("Error parsing filing row: %s", e)
                         continue
-        logger.info(f"Company filings scraped for {symbol}: {filings}")
         return filings
 
-    def get_yield_data(self) -> Dict:
-        """Get current yield data."""
+    def get_yield_data(self, refresh: bool = False) -> Dict:
+        """Get current yield data, served from cache unless `refresh`."""
+        cached = MISS if refresh else self.cache.get(('yields',))
+        if cached is not MISS:
+            return cached
         url = f"{self.base_urls['yahoo_finance']}/bonds"
-        html = self._make_request(url)
+        html = self._make_request(url, stage="scraper.yields.fetch")
         yield_data = {
             'timestamp': datetime.now().isoformat(),
             'yields': []
         }
         if html:
-            soup = BeautifulSoup(html, 'html.parser')
-            yield_table = soup.find('table', {'class': 'bonds'})
-            if yield_table:
-                rows = yield_table.find_all('tr')
-                for row in rows[1:]:  # Skip header
-                    try:
-                        cols = row.find_all('td')
-                        yield_data['yields'].append({
-                            'term': cols[0].text.strip(),
-                            'rate': cols[1].text.strip()
-                        })
-                    except Exception as e:
-                        logger.warning(f"Error parsing yield row: {e}")
-                        continue
-        logger.info(f"Yield data scraped: {yield_data}")
+            with track_stage("scraper.yields.parse"):
+                soup = bs4.BeautifulSoup(html, 'html.parser')
+                yield_table = soup.find('table', {'class': 'bonds'})
+                if yield_table:
+                    rows = yield_table.find_all('tr')
+                    for row in rows[1:]:  # Skip header
+                        try:
+                            cols = row.find_all('td')
+                            yield_data['yields'].append({
+                                'term': cols[0].text.strip(),
+                                'rate': cols[1].text.strip()
+                            })
+                        except Exception as e:
+                            logger.warning("Error parsing yield row: %s", e)
+                            continue
+            self.cache.set(('yields',), yield_data)
+        logger.info("Yield data scraped: %s", summarize(yield_data))
         return yield_data
\ No newline at end of file
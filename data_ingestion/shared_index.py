@@ -0,0 +1,164 @@
+import json
+import logging
+import mmap
+import os
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils.file_lock import FileLock
+from utils.lazy import lazy_import
+from utils.metrics import track_stage
+
+logger = logging.getLogger("retriever_agent.shared_index")
+
+faiss = lazy_import("faiss")
+
+
+def _replace(src: str, dst: str, attempts: int = 50):
+    """os.replace, retried while a reader briefly holds `dst` open (which blocks it on Windows)."""
+    for attempt in range(attempts):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.01)
+
+
+class StoredDocument:
+    __slots__ = ("text", "metadata")
+
+    def __init__(self, text: str, metadata: Dict):
+        self.text = text
+        self.metadata = metadata
+
+
+class MappedIndex:
+    """
+    Append-only vector and document store shared by every worker process through
+    memory-mapped files, so the OS page cache holds a single copy however many workers
+    read it:
+
+    - vectors.f32: float32 rows, searched in place with faiss.knn (exact L2, like IndexFlatL2)
+    - documents.jsonl + offsets.u64: document JSON and the end offset of each record
+    - manifest.json: committed row count and document bytes, replaced atomically
+
+    Writers append under an exclusive file lock and publish by rewriting the manifest
+    last; readers only look at the first `count` committed rows, so they never see a
+    half-written batch. Leftovers from a writer that crashed mid-append are overwritten
+    by the next writer; files are never truncated, since readers may have them mapped.
+    """
+    def __init__(self, root: str, dimension: int):
+        self.root = root
+        self.dimension = dimension
+        os.makedirs(root, exist_ok=True)
+        self._paths = {name: os.path.join(root, name)
+                       for name in ("vectors.f32", "documents.jsonl", "offsets.u64", "manifest.json")}
+        self._lock = FileLock(os.path.join(root, "write.lock"))
+        self.count = 0
+        self._manifest_version = None
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._offsets = np.empty(0, dtype=np.uint64)
+        self._documents = b""
+        self.index_id = self._read_index_id()
+
+    def _read_index_id(self) -> str:
+        """Identity of this index, created with it; workers agree on the first one written."""
+        path = os.path.join(self.root, "index_id")
+        if not os.path.exists(path):
+            # Written in full, then linked into place, so no worker reads a partial id
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w") as f:
+                f.write(uuid.uuid4().hex)
+            try:
+                os.link(tmp, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        with open(path) as f:
+            return f.read().strip()
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self._paths["manifest.json"]) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"count": 0, "document_bytes": 0, "dimension": self.dimension}
+        if manifest["dimension"] != self.dimension:
+            raise ValueError(f"Shared index at {self.root} has dimension {manifest['dimension']}, "
+                             f"expected {self.dimension}")
+        return manifest
+
+    def refresh(self) -> Tuple[int, int]:
+        """Map rows committed by any process since the last call; returns the new row range."""
+        try:
+            stat = os.stat(self._paths["manifest.json"])
+        except FileNotFoundError:
+            return self.count, self.count
+        # The manifest is replaced on every commit, so a new inode means new rows
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self._manifest_version:
+            return self.count, self.count
+        manifest = self._read_manifest()
+        previous, count = self.count, manifest["count"]
+        if count:
+            self._vectors = np.memmap(self._paths["vectors.f32"], dtype=np.float32, mode="r",
+                                      shape=(count, self.dimension))
+            self._offsets = np.memmap(self._paths["offsets.u64"], dtype=np.uint64, mode="r", shape=(count,))
+            with open(self._paths["documents.jsonl"], "rb") as f:
+                self._documents = mmap.mmap(f.fileno(), manifest["document_bytes"], access=mmap.ACCESS_READ)
+        self.count = count
+        self._manifest_version = version
+        return previous, count
+
+    def append(self, documents: List[Dict], vectors: np.ndarray):
+        """Append documents ({"text", "metadata"}) and their vectors as one committed batch."""
+        if not documents:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        records = [json.dumps(doc, separators=(",", ":")).encode() + b"\n" for doc in documents]
+        with self._lock, track_stage("retriever.shared.append"):
+            manifest = self._read_manifest()
+            count, document_bytes = manifest["count"], manifest["document_bytes"]
+            ends = document_bytes + np.cumsum([len(r) for r in records], dtype=np.uint64)
+            for name, size, payload in (
+                ("vectors.f32", count * self.dimension * 4, vectors.tobytes()),
+                ("offsets.u64", count * 8, ends.astype(np.uint64).tobytes()),
+                ("documents.jsonl", document_bytes, b"".join(records)),
+            ):
+                # Write at the committed end rather than truncating: readers keep these files
+                # mapped and Windows cannot truncate a mapped file. Bytes left past the end by
+                # a crashed writer are overwritten here or ignored, as readers stop at `count`.
+                fd = os.open(self._paths[name], os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+                with os.fdopen(fd, "r+b") as f:
+                    f.seek(size)
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            tmp = self._paths["manifest.json"] + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"count": count + len(documents), "document_bytes": int(ends[-1]),
+                           "dimension": self.dimension}, f)
+            _replace(tmp, self._paths["manifest.json"])
+        logger.info("Appended %s documents to shared index (%s total).", len(documents), count + len(documents))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> StoredDocument:
+        start = int(self._offsets[i - 1]) if i else 0
+        record = json.loads(self._documents[start:int(self._offsets[i])])
+        return StoredDocument(record["text"], record.get("metadata", {}))
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Squared L2 distances and row ids of the `top_k` nearest committed vectors."""
+        k = min(top_k, self.count)
+        if not k:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        distances, indices = faiss.knn(np.asarray(query, dtype=np.float32).reshape(1, -1), self._vectors, k)
+        return distances[0], indices[0]
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger("orchestrator.brief_stream")
+
+
+def _fingerprint(event: Dict) -> str:
+    """Hash of the parts of a brief that matter to viewers, ignoring generation timestamps."""
+    analysis = {k: v for k, v in event.get("analysis_data", {}).items() if k != "timestamp"}
+    content = {"brief": event.get("brief"), "analysis_data": analysis,
+               "data_freshness": event.get("data_freshness")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class BriefBroadcaster:
+    """
+    Fans brief updates out to Server-Sent Events subscribers, pushing only when the content
+    changes. While anyone is subscribed, a single background task regenerates the brief
+    every `interval` seconds, so upstream load is independent of the number of dashboards.
+    """
+    def __init__(self, generate: Callable[[], Awaitable[Dict]], interval: float = 60.0,
+                 queue_size: int = 8):
+        self.generate = generate
+        self.interval = interval
+        self.queue_size = queue_size
+        self.latest: Optional[Dict] = None
+        self.version = 0
+        self._fingerprint: Optional[str] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, event: Dict) -> bool:
+        """Broadcast `event` unless it matches the last published brief; returns True if sent."""
+        fingerprint = _fingerprint(event)
+        if fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+        self.version += 1
+        self.latest = {**event, "version": self.version}
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow consumer: drop its oldest update, it only needs the newest brief
+                queue.get_nowait()
+            queue.put_nowait(self.latest)
+        logger.info("Published brief version %s to %s subscriber(s).", self.version, len(self._subscribers))
+        return True
+
+    async def _refresh_loop(self):
+        while self._subscribers:
+            try:
+                self.publish(await self.generate())
+            except Exception as e:
+                logger.warning("Background brief refresh failed: %s", e)
+            await asyncio.sleep(self.interval)
+        self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def stream(self, keepalive: float = 15.0):
+        """Async generator of SSE frames for one subscriber."""
+        queue = self.subscribe()
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield f": keepalive {datetime.now().isoformat()}\n\n"
+                    continue
+                yield f"id: {event['version']}\nevent: brief\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            self.unsubscribe(queue)
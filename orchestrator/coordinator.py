@@ -1,119 +1,262 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Optional
 from datetime import datetime
 import httpx
 import asyncio
+import base64
+import os
+from orchestrator.brief_stream import BriefBroadcaster
+from utils.admission import add_admission_control, priority_headers, request_priority
+from utils.metrics import instrument_app, trace_headers, track_stage
 
 class MarketQuery(BaseModel):
     query: str
     portfolio_id: Optional[str] = None
     region: str = "Asia"
     sector: str = "Technology"
+    include_audio: bool = True
 
 class OrchestrationResponse(BaseModel):
+    # Audio is binary mp3; base64 keeps the JSON response valid
+    model_config = ConfigDict(ser_json_bytes="base64")
+
     text_response: str
     audio_response: Optional[bytes] = None
     analysis_data: Dict
+    data_freshness: Dict = {}
     timestamp: str
 
 app = FastAPI()
 
+add_admission_control(app)
+instrument_app(app, "orchestrator")
+
+# Symbols covered by the brief for each region
+REGION_WATCHLISTS = {
+    "Asia": ["TSM", "005930.KS", "9988.HK", "6758.T"],
+    "US": ["AAPL", "MSFT", "NVDA", "GOOGL"],
+    "Europe": ["ASML", "SAP", "SIE.DE"],
+}
+
+async def _propagate_trace(request: httpx.Request):
+    """Forward the inbound trace ID and priority class on every call made to downstream agents."""
+    request.headers.update(trace_headers())
+    request.headers.update(priority_headers())
+
+def _downstream_error(e: httpx.HTTPStatusError, what: str) -> HTTPException:
+    """Pass an agent's load shedding (429/503 + Retry-After) through instead of a 500."""
+    response = e.response
+    if response.status_code in (429, 503):
+        return HTTPException(status_code=503, detail=f"{what}: downstream agent overloaded",
+                             headers={"Retry-After": response.headers.get("Retry-After", "1")})
+    return HTTPException(status_code=500, detail=f"{what}: {str(e)}")
+
 class ServiceOrchestrator:
     def __init__(self):
         self.services = {
-            'api': 'http://localhost:8000',
-            'scraping': 'http://localhost:8001',
-            'voice': 'http://localhost:8002',
-            'retriever': 'http://localhost:8003',
-            'analysis': 'http://localhost:8004',
-            'language': 'http://localhost:8005'
+            'api': 'http://localhost:8001',
+            'scraping': 'http://localhost:8002',
+            'analysis': 'http://localhost:8003',
+            'retriever': 'http://localhost:8004',
+            'voice': 'http://localhost:8005',
+            'language': 'http://localhost:8006'
         }
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            event_hooks={"request": [_propagate_trace]}
+        )
 
     async def check_services_health(self) -> Dict[str, bool]:
-        health_status = {}
-        for service, url in self.services.items():
+        async def check(url: str) -> bool:
             try:
                 response = await self.client.get(f"{url}/health")
-                health_status[service] = response.status_code == 200
+                return response.status_code == 200
             except Exception:
-                health_status[service] = False
-        return health_status
+                return False
+
+        results = await asyncio.gather(*(check(url) for url in self.services.values()))
+        return dict(zip(self.services, results))
 
     async def get_market_data(self, region: str, sector: str) -> Dict:
         try:
-            # Get market data from API agent
-            response = await self.client.get(
-                f"{self.services['api']}/stock-data",
-                params={"region": region, "sector": sector}
+            # Get quotes and earnings surprises for the region's watchlist from API agent
+            symbols = REGION_WATCHLISTS.get(region, [])
+            earnings_response, *quote_responses = await asyncio.gather(
+                self.client.post(
+                    f"{self.services['api']}/earnings-surprises",
+                    json={"symbols": symbols}
+                ),
+                *(self.client.get(f"{self.services['api']}/stock/{symbol}") for symbol in symbols)
             )
-            return response.json()
+            earnings_response.raise_for_status()
+            for response in quote_responses:
+                # A missing quote (404) is dropped; a shed or throttled one fails the brief
+                if response.status_code in (429, 503):
+                    response.raise_for_status()
+            return {
+                "region": region,
+                "sector": sector,
+                "quotes": [r.json() for r in quote_responses if r.status_code == 200],
+                "earnings": earnings_response.json()["surprises"]
+            }
+        except httpx.HTTPStatusError as e:
+            raise _downstream_error(e, "Error fetching market data")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching market data: {str(e)}")
 
+    async def get_data_freshness(self) -> Dict[str, Dict[str, str]]:
+        """Pre-warm status per dataset from the API and Scraping agents; 'unknown' if unreachable."""
+        async def fetch(service: str) -> Dict[str, str]:
+            try:
+                response = await self.client.get(f"{self.services[service]}/prewarm/status")
+                response.raise_for_status()
+                return {name: entry["status"] for name, entry in response.json()["datasets"].items()}
+            except Exception:
+                return {"status": "unknown"}
+
+        api_status, scraping_status = await asyncio.gather(fetch('api'), fetch('scraping'))
+        return {'api': api_status, 'scraping': scraping_status}
+
     async def get_sentiment_data(self, region: str) -> Dict:
         try:
             response = await self.client.get(
                 f"{self.services['scraping']}/market-sentiment/{region}"
             )
+            response.raise_for_status()
             return response.json()
+        except httpx.HTTPStatusError as e:
+            raise _downstream_error(e, "Error fetching sentiment data")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching sentiment data: {str(e)}")
 
     async def process_query(self, query: MarketQuery) -> OrchestrationResponse:
         try:
             # Gather data in parallel
-            market_data, sentiment_data = await asyncio.gather(
-                self.get_market_data(query.region, query.sector),
-                self.get_sentiment_data(query.region)
-            )
+            with track_stage("orchestrator.gather"):
+                market_data, sentiment_data, data_freshness = await asyncio.gather(
+                    self.get_market_data(query.region, query.sector),
+                    self.get_sentiment_data(query.region),
+                    self.get_data_freshness()
+                )
 
             # Analyze data
-            analysis_response = await self.client.post(
-                f"{self.services['analysis']}/analyze",
-                json={
-                    "market_data": market_data,
-                    "sentiment_data": sentiment_data
-                }
-            )
+            with track_stage("orchestrator.analysis"):
+                analysis_response = await self.client.post(
+                    f"{self.services['analysis']}/analyze",
+                    json={
+                        "market_data": market_data,
+                        "earnings_data": market_data["earnings"],
+                        "sentiment_data": sentiment_data,
+                        "portfolio_data": {}
+                    }
+                )
+                analysis_response.raise_for_status()
             analysis_results = analysis_response.json()
 
             # Generate language response
-            language_response = await self.client.post(
-                f"{self.services['language']}/analyze",
-                json={
-                    "portfolio_metrics": analysis_results["portfolio_metrics"],
-                    "earnings_analysis": analysis_results["earnings_analysis"],
-                    "market_sentiment": analysis_results["market_sentiment"],
-                    "query": query.query
-                }
-            )
+            with track_stage("orchestrator.language"):
+                language_response = await self.client.post(
+                    f"{self.services['language']}/analyze",
+                    json={
+                        "portfolio_metrics": analysis_results["portfolio_metrics"],
+                        "earnings_analysis": analysis_results["earnings_analysis"],
+                        "market_sentiment": analysis_results["market_sentiment"],
+                        "query": query.query
+                    }
+                )
+                language_response.raise_for_status()
             text_response = language_response.json()["response"]
 
             # Convert to speech
-            voice_response = await self.client.post(
-                f"{self.services['voice']}/text-to-speech",
-                json={"text": text_response}
-            )
-            audio_data = voice_response.content
+            audio_data = None
+            if query.include_audio:
+                with track_stage("orchestrator.voice"):
+                    voice_response = await self.client.post(
+                        f"{self.services['voice']}/text-to-speech",
+                        json={"text": text_response}
+                    )
+                # A shed or failed TTS call drops the audio rather than the whole brief
+                audio_data = voice_response.content if voice_response.status_code == 200 else None
 
             return OrchestrationResponse(
                 text_response=text_response,
                 audio_response=audio_data,
                 analysis_data=analysis_results,
+                data_freshness=data_freshness,
                 timestamp=datetime.now().isoformat()
             )
 
+        except HTTPException:
+            raise
+        except httpx.HTTPStatusError as e:
+            raise _downstream_error(e, "Orchestration error")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Orchestration error: {str(e)}")
 
 orchestrator = ServiceOrchestrator()
 
+def _brief_event(response: OrchestrationResponse) -> Dict:
+    return {
+        "brief": response.text_response,
+        "analysis_data": response.analysis_data,
+        "data_freshness": response.data_freshness,
+        "timestamp": response.timestamp
+    }
+
+def _default_query() -> MarketQuery:
+    return MarketQuery(
+        query=os.getenv("BRIEF_DEFAULT_QUERY", "Give me the morning market brief."),
+        region=os.getenv("BRIEF_DEFAULT_REGION", "Asia"),
+        include_audio=False
+    )
+
+def _is_default_brief(query: MarketQuery) -> bool:
+    """Whether `query` asks for the same brief the /events refresher generates."""
+    default = _default_query()
+    return (query.query.strip(), query.region, query.sector, query.portfolio_id) == \
+        (default.query, default.region, default.sector, default.portfolio_id)
+
+async def _generate_default_brief() -> Dict:
+    query = _default_query()
+    # The scheduled brief is queued ahead of ad-hoc queries by every agent
+    with request_priority("high"):
+        return _brief_event(await orchestrator.process_query(query))
+
+# Dashboards subscribe to /events instead of polling; one refresher serves all of them
+brief_broadcaster = BriefBroadcaster(
+    _generate_default_brief,
+    interval=float(os.getenv("BRIEF_REFRESH_SECONDS", 60))
+)
+
 @app.post("/process-query", response_model=OrchestrationResponse)
 async def process_market_query(query: MarketQuery):
     return await orchestrator.process_query(query)
 
+@app.post("/get_market_brief")
+async def get_market_brief(query: MarketQuery):
+    """
+    Generate a brief for the UI. Only the default brief is pushed to /events subscribers;
+    other queries are specific to their caller and would overwrite every dashboard's view.
+    """
+    response = await orchestrator.process_query(query)
+    event = _brief_event(response)
+    if _is_default_brief(query):
+        brief_broadcaster.publish(event)
+    if response.audio_response:
+        event["audio"] = base64.b64encode(response.audio_response).decode()
+    return event
+
+@app.get("/events")
+async def brief_events():
+    """Server-Sent Events stream that pushes a brief only when its content changes."""
+    return StreamingResponse(
+        brief_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/health")
 async def health_check():
     health_status = await orchestrator.check_services_health()
@@ -1,7 +1,10 @@
 import streamlit as st
 import httpx
 import json
-from typing import Dict, List
+import base64
+import threading
+import time
+from typing import Dict, List, Optional
 
 # Configure page settings
 st.set_page_config(
@@ -16,30 +19,82 @@ SERVICE_URLS = {
     "voice": "http://localhost:8005"
 }
 
+# Seconds a health result is reused across reruns and sessions
+HEALTH_TTL_SECONDS = 15
+
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """One pooled HTTP client shared by every session and rerun."""
+    return httpx.Client(timeout=httpx.Timeout(30.0, connect=2.0))
+
+@st.cache_data(ttl=HEALTH_TTL_SECONDS, show_spinner=False)
 def check_services_health() -> Dict[str, bool]:
-    """Check the health of all required services."""
+    """Check the health of all required services (cached for HEALTH_TTL_SECONDS)."""
     health_status = {}
+    client = get_client()
     for service, url in SERVICE_URLS.items():
         try:
-            with httpx.Client(timeout=2.0) as client:
-                response = client.get(f"{url}/health")
-                health_status[service] = response.status_code == 200
-        except:
+            response = client.get(f"{url}/health", timeout=2.0)
+            health_status[service] = response.status_code == 200
+        except Exception:
             health_status[service] = False
     return health_status
 
 def get_market_brief(query: str = "") -> Dict:
     """Get market brief from the orchestrator."""
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(
-                f"{SERVICE_URLS['orchestrator']}/get_market_brief",
-                json={"query": query}
-            )
-            return response.json()
+        response = get_client().post(
+            f"{SERVICE_URLS['orchestrator']}/get_market_brief",
+            json={"query": query}
+        )
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         return {"error": str(e)}
 
+class BriefStream:
+    """
+    Background subscriber to the orchestrator's /events stream. Keeps only the latest
+    pushed brief in memory, so auto-refresh reruns read local state instead of polling.
+    """
+    def __init__(self, url: str):
+        self.url = url
+        self.latest: Optional[Dict] = None
+        self.connected = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                with httpx.stream("GET", self.url, timeout=httpx.Timeout(None, connect=5.0)) as response:
+                    self.connected = True
+                    backoff = 1.0
+                    for line in response.iter_lines():
+                        if line.startswith("data:"):
+                            self.latest = json.loads(line[len("data:"):])
+            except Exception:
+                pass
+            self.connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+@st.cache_resource
+def get_brief_stream() -> BriefStream:
+    """A single /events subscription shared by every session of this Streamlit server."""
+    return BriefStream(f"{SERVICE_URLS['orchestrator']}/events")
+
+@st.fragment(run_every=2)
+def live_brief():
+    """Re-render the latest pushed brief; reruns only read local memory."""
+    stream = get_brief_stream()
+    event = stream.latest
+    if event is None:
+        st.caption("Waiting for the first brief..." if stream.connected else "Connecting to live updates...")
+        return
+    st.write(f"### Live Brief (v{event['version']}, {event['timestamp']})")
+    st.write(event["brief"])
+
 def main():
     st.title("🤖 AI Finance Assistant")
     
@@ -68,7 +123,7 @@ def main():
     with col1:
         enable_voice = st.checkbox("Enable voice output", value=True)
     with col2:
-        auto_refresh = st.checkbox("Auto-refresh (30s)", value=False)
+        auto_refresh = st.checkbox("Live updates", value=False)
     
     # Generate brief button
     if st.button("Generate Brief", type="primary", disabled=not all(health_status.values())):
@@ -83,8 +138,8 @@ def main():
                 st.write(result["brief"])
                 
                 # Handle voice output
-                if enable_voice and "audio_url" in result:
-                    st.audio(result["audio_url"], format="audio/mp3")
+                if enable_voice and "audio" in result:
+                    st.audio(base64.b64decode(result["audio"]), format="audio/mp3")
     
     # Display additional information
     st.sidebar.write("### Market Data Sources")
@@ -95,10 +150,9 @@ def main():
         "- Global market indices"
     )
     
-    # Auto-refresh logic
+    # Auto-refresh: render briefs pushed by the orchestrator instead of re-running the script
     if auto_refresh:
-        st.empty()
-        st.rerun()
+        live_brief()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
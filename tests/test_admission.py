@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.admission import PRIORITIES, AdmissionController, add_admission_control
+from utils.rate_limit import TokenBucket, UpstreamLimits, UpstreamThrottled, throttled_error
+
+
+def test_token_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(rate=100, burst=3)
+    assert all(bucket.acquire() for _ in range(3))
+    assert not bucket.acquire()
+    assert bucket.acquire(max_wait=0.1)
+
+    bucket.throttle(30)
+    assert not bucket.acquire(max_wait=0.1)
+    assert bucket.retry_after() > 29
+
+
+def test_upstream_limits_are_per_host(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_RATE_LIMITS", "slow.example=1:1")
+    limits = UpstreamLimits()
+    limits.acquire("slow.example", max_wait=0)
+    try:
+        limits.acquire("slow.example", max_wait=0)
+        assert False, "second request should have been throttled"
+    except UpstreamThrottled as e:
+        assert e.host == "slow.example" and e.retry_after > 0
+    limits.acquire("fast.example", max_wait=0)
+
+
+def test_throttled_upstream_maps_to_503_with_retry_after():
+    error = throttled_error(UpstreamThrottled("finance.yahoo.com", 2.2))
+    assert error.status_code == 503 and error.headers == {"Retry-After": "3"}
+
+
+def test_high_priority_evicts_low_and_is_served_first():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=2, queue_timeout=1)
+        assert await controller.acquire(PRIORITIES["normal"]) is None  # holds the only slot
+
+        low = asyncio.ensure_future(controller.acquire(PRIORITIES["low"]))
+        normal = asyncio.ensure_future(controller.acquire(PRIORITIES["normal"]))
+        await asyncio.sleep(0)
+        assert await controller.acquire(PRIORITIES["low"]) == "queue_full"
+
+        high = asyncio.ensure_future(controller.acquire(PRIORITIES["high"]))
+        assert await low == "evicted"
+
+        controller.release(0.01)
+        assert await high is None
+        assert not normal.done()
+        controller.release(0.01)
+        assert await normal is None
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed"] == {"queue_full": 1, "evicted": 1, "timeout": 0}
+
+
+def test_queue_timeout_is_shed_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+        await controller.acquire(PRIORITIES["normal"])
+        started = time.perf_counter()
+        reason = await controller.acquire(PRIORITIES["high"])
+        return reason, time.perf_counter() - started, controller.retry_after()
+
+    reason, waited, retry_after = asyncio.run(scenario())
+    assert reason == "timeout" and waited < 1
+    assert retry_after >= 1
+
+
+def test_middleware_sheds_with_status_and_exempts_health(monkeypatch):
+    monkeypatch.setenv("AGENT_MAX_CONCURRENCY", "0")
+    monkeypatch.setenv("AGENT_MAX_QUEUE", "0")
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    add_admission_control(app)
+    client = TestClient(app)
+    response = client.get("/work", headers={"X-Priority": "high"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/health").status_code == 200
+    assert client.get("/admission").json()["shed"]["queue_full"] == 1
@@ -0,0 +1,28 @@
+import asyncio
+
+from orchestrator.brief_stream import BriefBroadcaster
+
+
+def test_only_changed_briefs_are_pushed():
+    async def scenario():
+        generated = []
+
+        async def generate():
+            generated.append(1)
+            return {"brief": "Sentiment is neutral.", "analysis_data": {"timestamp": str(len(generated))}}
+
+        broadcaster = BriefBroadcaster(generate, interval=0.01)
+        queue = broadcaster.subscribe()
+        first = await asyncio.wait_for(queue.get(), timeout=1)
+        await asyncio.sleep(0.05)  # several refreshes with identical content
+
+        assert len(generated) > 1
+        assert queue.empty()
+        assert broadcaster.publish({"brief": "Sentiment turned bearish.", "analysis_data": {}})
+        second = await asyncio.wait_for(queue.get(), timeout=1)
+        broadcaster.unsubscribe(queue)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert (first["version"], second["version"]) == (1, 2)
+    assert second["brief"] == "Sentiment turned bearish."
@@ -0,0 +1,40 @@
+import numpy as np
+
+from data_ingestion.embedder import EmbeddingService, HashingEmbedder
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dimension=64)
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(len(texts))
+        return super().embed(texts)
+
+
+def test_hashing_embedder_is_normalized_and_ranks_overlap_higher():
+    vectors = HashingEmbedder().embed([
+        "TSMC revenue beat estimates on AI demand",
+        "TSMC revenue beat estimates on strong AI demand",
+        "Bond yields fell after the central bank meeting",
+        "",
+    ])
+    assert vectors.shape == (4, 768)
+    np.testing.assert_allclose(np.linalg.norm(vectors[:3], axis=1), 1.0, rtol=1e-5)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_embedding_service_batches_and_skips_cached_text():
+    embedder = CountingEmbedder()
+    service = EmbeddingService(embedder, batch_size=2)
+    first = service.embed(["a", "b", "c", "a"])
+    assert embedder.batches == [2, 1]
+    np.testing.assert_array_equal(first[0], first[3])
+
+    second = service.embed(["c", "d"])
+    assert embedder.batches == [2, 1, 1]
+    np.testing.assert_array_equal(second[0], first[2])
+    stats = service.stats()
+    assert stats["chunks_requested"] == 6 and stats["chunks_embedded"] == 4 and stats["cache_hits"] == 1
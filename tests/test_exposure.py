@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+from data_ingestion.api_fetcher import MarketDataFetcher
+from data_ingestion.exposure import ExposureCube, ExposureStore
+
+POSITIONS = [
+    {"value": 22.0, "region": "Asia", "sector": "Technology", "currency": "TWD"},
+    {"value": 8.0, "region": "Asia", "sector": "Technology", "currency": "KRW"},
+    {"value": 40.0, "region": "US", "sector": "Technology", "currency": "USD"},
+    {"value": 30.0, "region": "US", "sector": "Financials", "currency": "USD"},
+]
+
+
+def test_cube_slices_match_direct_sums():
+    cube = ExposureCube.from_positions(POSITIONS)
+    assert cube.total == 100.0
+    assert cube.slice(region="Asia", sector="Technology") == 30.0
+    assert cube.slice(sector="Technology", currency=["USD", "KRW"]) == 48.0
+    assert cube.slice(region="Europe") == 0.0
+
+
+def test_store_reports_day_and_week_deltas(tmp_path):
+    store = ExposureStore(root=str(tmp_path))
+    # Friday 2025-05-23 (week ago) and Friday 2025-05-30 (previous trading day for Monday)
+    store.save(ExposureCube.from_positions(POSITIONS[1:]), date(2025, 5, 23))
+    store.save(ExposureCube.from_positions([dict(POSITIONS[0], value=10.0)] + POSITIONS[1:]), date(2025, 5, 30))
+    today = ExposureCube.from_positions(POSITIONS)
+
+    result = store.query(date(2025, 6, 2), cube=today, region="Asia", sector="Technology")
+    assert result["exposure_percentage"] == pytest.approx(30.0)
+    assert result["day_over_day"]["as_of"] == "2025-05-30"
+    assert result["day_over_day"]["percentage_point_change"] == pytest.approx(30.0 - 18.0 / 88.0 * 100)
+    assert result["week_over_week"]["as_of"] == "2025-05-23"
+
+    reopened = ExposureStore(root=str(tmp_path))
+    assert reopened.snapshot_dates() == [date(2025, 5, 23), date(2025, 5, 30)]
+    assert reopened.load(date(2025, 5, 30)).slice(region="Asia") == 18.0
+
+
+def test_asia_tech_exposure_stores_the_days_first_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXPOSURE_STORE_DIR", str(tmp_path / "exposure"))
+    monkeypatch.setenv("PRICE_STORE_DIR", str(tmp_path / "prices"))
+    fetcher = MarketDataFetcher()
+    fetcher.get_exposure(POSITIONS[1:], region="Asia")  # what-if: not stored
+    assert fetcher.exposure_store.snapshot_dates() == []
+
+    first = fetcher.get_asia_tech_exposure(POSITIONS)
+    fetcher.get_asia_tech_exposure(POSITIONS[1:])
+    assert fetcher.exposure_store.snapshot_dates() == [date.today()]
+    assert first["exposure_percentage"] == pytest.approx(30.0)
+    assert fetcher.exposure_store.load(date.today()).total == 100.0
@@ -0,0 +1,104 @@
+import pytest
+
+from data_ingestion.filings_pipeline import FilingsPipeline
+from utils.rate_limit import UpstreamThrottled
+
+REPORT = ("Quarterly report for the period ended March 31 2025 covering revenue by segment "
+          "gross margin operating expenses capital expenditure and guidance for the next quarter")
+
+FILINGS = {
+    "TSM": [
+        {"date": "2025-04-17", "type": "10-Q", "description": REPORT},
+        {"date": "2025-04-18", "type": "10-Q/A", "description": REPORT.replace("guidance", "outlook")},
+        {"date": "2025-01-16", "type": "8-K", "description": "Fourth quarter earnings release"},
+    ],
+    "AAPL": [{"date": "2025-04-17", "type": "10-Q", "description": REPORT}],
+    "MSFT": [{"date": "2025-02-20", "type": "10-K", "description": "Annual report for fiscal 2024"}],
+}
+
+
+def test_pipeline_skips_near_duplicates_and_already_indexed_content(tmp_path):
+    indexed = []
+    pipeline = FilingsPipeline(FILINGS.get, indexed.extend, state_dir=str(tmp_path), batch_size=2)
+    stats = pipeline.run(["tsm", "aapl", "msft"])
+    # The amended TSM report is a near duplicate; AAPL's identical text is another company's
+    assert stats["near_duplicates"] == 1 and stats["exact_duplicates"] == 0
+    assert [c["metadata"]["symbol"] for c in indexed] == ["TSM", "TSM", "AAPL", "MSFT"]
+
+    assert pipeline.run(["TSM", "AAPL", "MSFT"])["symbols_completed"] == 0
+    stats = pipeline.run(["TSM"], resume=False)
+    assert stats["exact_duplicates"] == 2 and stats["indexed"] == 0
+    pipeline.close()
+
+
+def test_pipeline_resumes_after_failed_append(tmp_path):
+    indexed = []
+
+    def flaky_sink(batch):
+        if any(c["metadata"]["symbol"] == "MSFT" for c in batch):
+            raise RuntimeError("retriever unavailable")
+        indexed.extend(batch)
+
+    pipeline = FilingsPipeline(FILINGS.get, flaky_sink, state_dir=str(tmp_path), batch_size=3)
+    with pytest.raises(RuntimeError):
+        pipeline.run(["TSM", "AAPL", "MSFT"])
+    pipeline.close()
+
+    pipeline = FilingsPipeline(FILINGS.get, indexed.extend, state_dir=str(tmp_path), batch_size=3)
+    stats = pipeline.run(["TSM", "AAPL", "MSFT"])
+    pipeline.close()
+    assert stats["indexed"] == 1
+    assert [c["metadata"]["symbol"] for c in indexed] == ["TSM", "TSM", "AAPL", "MSFT"]
+
+
+def test_retry_on_the_same_pipeline_indexes_chunks_of_a_failed_append(tmp_path):
+    indexed = []
+    failures = iter([RuntimeError("retriever unavailable")])
+
+    def sink_failing_once(batch):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        indexed.extend(batch)
+
+    pipeline = FilingsPipeline(FILINGS.get, sink_failing_once, state_dir=str(tmp_path), batch_size=3)
+    with pytest.raises(RuntimeError):
+        pipeline.run(["TSM", "AAPL", "MSFT"])
+    stats = pipeline.run(["TSM", "AAPL", "MSFT"])
+    pipeline.close()
+    assert stats["exact_duplicates"] == 0 and stats["indexed"] == 4
+    assert [c["metadata"]["symbol"] for c in indexed] == ["TSM", "TSM", "AAPL", "MSFT"]
+
+
+def test_checkpoints_are_discarded_when_the_index_changes(tmp_path):
+    indexed = []
+    pipeline = FilingsPipeline(FILINGS.get, indexed.extend, state_dir=str(tmp_path), index_id="first")
+    pipeline.run(["MSFT"])
+    pipeline.close()
+
+    pipeline = FilingsPipeline(FILINGS.get, indexed.extend, state_dir=str(tmp_path), index_id="first")
+    assert pipeline.run(["MSFT"])["symbols_completed"] == 0
+    pipeline.close()
+
+    # The retriever restarted with an empty in-memory index
+    pipeline = FilingsPipeline(FILINGS.get, indexed.extend, state_dir=str(tmp_path), index_id="second")
+    stats = pipeline.run(["MSFT"])
+    pipeline.close()
+    assert stats["indexed"] == 1 and stats["exact_duplicates"] == 0
+    assert len(indexed) == 2
+
+
+def test_backfill_waits_out_upstream_rate_limits(tmp_path):
+    calls = []
+
+    def throttled_once(symbol):
+        calls.append(symbol)
+        if len(calls) == 1:
+            raise UpstreamThrottled("www.marketwatch.com", retry_after=0.01)
+        return FILINGS.get(symbol)
+
+    indexed = []
+    pipeline = FilingsPipeline(throttled_once, indexed.extend, state_dir=str(tmp_path))
+    stats = pipeline.run(["MSFT"])
+    pipeline.close()
+    assert calls == ["MSFT", "MSFT"] and stats["indexed"] == 1
@@ -0,0 +1,34 @@
+import logging
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.lazy import ensure_loaded, lazy_import
+from utils.warmup import add_warmup
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    sys.modules.pop("colorsys", None)
+    colorsys = lazy_import("colorsys")
+    assert "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert ensure_loaded(colorsys) is sys.modules["colorsys"]
+
+
+def test_warmup_runs_steps_once_and_retries_failures():
+    calls = []
+
+    def flaky():
+        calls.append("flaky")
+        if calls.count("flaky") == 1:
+            raise RuntimeError("model download failed")
+
+    app = FastAPI()
+    add_warmup(app, logging.getLogger("test_warmup"), {"ok": lambda: calls.append("ok"), "flaky": flaky})
+    client = TestClient(app)
+    first = client.post("/warmup").json()
+    assert first["status"] == "partial" and first["steps"]["flaky"].startswith("failed")
+    assert client.post("/warmup").json()["status"] == "warm"
+    assert client.post("/warmup").json()["status"] == "warm"
+    assert calls == ["ok", "flaky", "ok", "flaky"]
@@ -0,0 +1,17 @@
+from data_ingestion.lexical_index import BM25Index, reciprocal_rank_fusion
+
+
+def test_bm25_ranks_exact_tickers_and_form_types_first():
+    index = BM25Index()
+    index.add(["TSMC 10-K annual report with revenue guidance", "TSMC quarterly revenue guidance"])
+    index.add(["Samsung 10-Q memory outlook", "Bond yields fell"])
+    ids, scores = index.search("TSMC 10-K guidance", top_k=3)
+    assert ids.tolist() == [0, 1]
+    assert scores[0] > scores[1] > 0
+    assert index.search("005930.KS", top_k=3)[0].size == 0
+    assert index.stats()["documents"] == 4
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[3, 1, 2], [1, 4]])
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 4, 2]
@@ -0,0 +1,46 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.metrics import Histogram, instrument_app, get_trace_id, track_stage
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    instrument_app(app, "test")
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with track_stage("test.lookup"):
+            return {"item_id": item_id, "trace_id": get_trace_id()}
+
+    return app
+
+
+def test_trace_id_is_propagated_and_echoed():
+    client = TestClient(_build_app())
+    response = client.get("/items/1", headers={"X-Request-ID": "abc123"})
+    assert response.json()["trace_id"] == "abc123"
+    assert response.headers["X-Request-ID"] == "abc123"
+
+    minted = client.get("/items/2")
+    assert minted.headers["X-Request-ID"] == minted.json()["trace_id"]
+
+
+def test_metrics_endpoint_uses_route_templates():
+    client = TestClient(_build_app())
+    client.get("/items/42")
+    body = client.get("/metrics").text
+    assert 'endpoint="/items/{item_id}"' in body
+    assert 'stage="test.lookup"' in body
+    assert "/items/42" not in body
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h", "doc", ("k",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "v")
+    lines = histogram.render()
+    assert 'h_bucket{k="v",le="0.1"} 1' in lines
+    assert 'h_bucket{k="v",le="1.0"} 2' in lines
+    assert 'h_bucket{k="v",le="+Inf"} 3' in lines
+    assert 'h_count{k="v"} 3' in lines
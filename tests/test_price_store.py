@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data_ingestion.price_store import PriceStore, missing_ranges
+
+
+def _fake_fetch(calls):
+    def fetch(symbol, start, end):
+        calls.append((symbol, start, end))
+        days = pd.bdate_range(start, end - timedelta(days=1))
+        close = 100.0 + (days - pd.Timestamp("2024-01-01")).days.to_numpy()
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                             "Volume": np.ones(len(days))}, index=days)
+    return fetch
+
+
+def test_missing_ranges_only_returns_gaps():
+    coverage = [(date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 3, 1), date(2024, 3, 31))]
+    assert missing_ranges(coverage, date(2024, 1, 15), date(2024, 3, 10)) == [
+        (date(2024, 2, 1), date(2024, 2, 29))]
+    assert missing_ranges(coverage, date(2024, 1, 5), date(2024, 1, 20)) == []
+
+
+def test_ensure_range_fetches_only_missing_dates(tmp_path):
+    calls = []
+    store = PriceStore(root=str(tmp_path), fetch=_fake_fetch(calls))
+    store.read("TSM", date(2024, 1, 1), date(2024, 1, 31))
+    store.read("TSM", date(2024, 1, 10), date(2024, 2, 15))
+    assert [(c[1], c[2]) for c in calls] == [
+        (date(2024, 1, 1), date(2024, 2, 1)),
+        (date(2024, 2, 1), date(2024, 2, 16)),
+    ]
+    bars = store.read("TSM", date(2024, 1, 1), date(2024, 2, 15))
+    assert len(calls) == 2
+    assert isinstance(bars["close"], np.memmap) or isinstance(bars["close"].base, np.memmap)
+    assert np.all(np.diff(bars["date"].astype(np.int64)) > 0)
+
+
+def test_empty_fetch_is_retried_once_stale(tmp_path):
+    calls = []
+    fetch = _fake_fetch(calls)
+    responses = iter([pd.DataFrame()])  # first call throttled: yfinance returns an empty frame
+
+    def flaky_fetch(symbol, start, end):
+        empty = next(responses, None)
+        if empty is not None:
+            calls.append((symbol, start, end))
+            return empty
+        return fetch(symbol, start, end)
+
+    store = PriceStore(root=str(tmp_path), fetch=flaky_fetch, recheck_after=timedelta(0))
+    assert len(store.read("TSM", date(2024, 1, 1), date(2024, 1, 31))["date"]) == 0
+    bars = store.read("TSM", date(2024, 1, 1), date(2024, 1, 31))
+    assert len(calls) == 2 and calls[0][1:] == calls[1][1:]
+    assert len(bars["date"]) == 23
+
+    # A weekend-only gap that returns nothing is covered and not fetched again
+    store.read("TSM", date(2024, 2, 3), date(2024, 2, 4))
+    store.read("TSM", date(2024, 2, 3), date(2024, 2, 4))
+    assert len(calls) == 3
+
+
+def test_reads_ending_today_and_unknown_symbols_fetch_once_per_recheck(tmp_path):
+    calls = []
+    fetch = _fake_fetch(calls)
+    store = PriceStore(root=str(tmp_path), fetch=lambda s, a, b: pd.DataFrame() if s == "NOPE" else fetch(s, a, b))
+    today = date.today()
+    for _ in range(3):
+        store.read("TSM", today - timedelta(days=30), today)
+        store.read("NOPE", today - timedelta(days=30), today)
+    assert len(calls) == 1
+
+    # Once stale, today's bar is fetched again; identical bars leave the columns alone
+    store.recheck_after = timedelta(0)
+    generations = sorted(p.name for p in (tmp_path / "TSM").glob("gen-*.done"))
+    store.read("TSM", today - timedelta(days=30), today)
+    assert len(calls) == 2 and calls[1][1:] == (today, today + timedelta(days=1))
+    assert sorted(p.name for p in (tmp_path / "TSM").glob("gen-*.done")) == generations
+
+
+def test_returns_matrix_aligns_symbols(tmp_path):
+    store = PriceStore(root=str(tmp_path), fetch=_fake_fetch([]))
+    dates, returns = store.returns_matrix(["TSM", "AAPL"], date(2024, 1, 1), date(2024, 1, 12))
+    assert returns.shape == (len(dates), 2)
+    assert np.allclose(returns[:, 0], returns[:, 1])
+    # 2024-01-02 over 2024-01-01
+    assert np.isclose(returns[0, 0], 101.0 / 100.0 - 1.0)
+
+
+def test_writes_add_generations_without_touching_mapped_files(tmp_path):
+    store = PriceStore(root=str(tmp_path), fetch=_fake_fetch([]))
+    january = store.read("TSM", date(2024, 1, 1), date(2024, 1, 31))
+    store.read("TSM", date(2024, 2, 1), date(2024, 2, 29))
+
+    files = sorted(p.name for p in (tmp_path / "TSM").iterdir())
+    assert "gen-2.done" in files and "gen-1.done" not in files and "close.2.npy" in files
+    assert len(january["date"]) == 23  # the old mapping stays readable
+    assert len(store.read("TSM", date(2024, 1, 1), date(2024, 2, 29), fetch_missing=False)["date"]) == 44
@@ -0,0 +1,68 @@
+import asyncio
+
+from data_ingestion.quote_hub import QuoteHub, QuoteSubscriber
+
+
+def test_one_poller_per_symbol_pushes_only_changed_fields():
+    async def scenario():
+        fetched = []
+        prices = iter([100.0, 100.0, 101.5] + [101.5] * 100)
+
+        def fetch(symbol):
+            fetched.append(symbol)
+            return {"symbol": symbol, "price": next(prices), "volume": 10, "timestamp": str(len(fetched))}
+
+        hub = QuoteHub(fetch, interval=0.01)
+        clients = [QuoteSubscriber() for _ in range(5)]
+        for client in clients:
+            hub.subscribe(client, ["TSM"])
+
+        first = await asyncio.wait_for(clients[0].next_updates(), timeout=1)
+        second = await asyncio.wait_for(clients[0].next_updates(), timeout=1)
+        late = QuoteSubscriber()
+        hub.subscribe(late, ["TSM"])
+        snapshot = await asyncio.wait_for(late.next_updates(), timeout=1)
+
+        stats = hub.stats()
+        for client in clients + [late]:
+            hub.unsubscribe(client)
+        await asyncio.sleep(0.05)
+        return fetched, first, second, snapshot, stats, hub.stats()
+
+    fetched, first, second, snapshot, stats, idle = asyncio.run(scenario())
+    assert set(fetched) == {"TSM"}
+    assert first["TSM"]["price"] == 100.0 and first["TSM"]["volume"] == 10
+    assert set(second["TSM"]) == {"price", "timestamp"} and second["TSM"]["price"] == 101.5
+    assert snapshot["TSM"]["price"] == 101.5 and "volume" in snapshot["TSM"]
+    assert stats["symbols"] == {"TSM": 6} and stats["subscribers"] == 6
+    assert idle["symbols"] == {}
+
+
+def test_slow_subscriber_gets_merged_updates():
+    async def scenario():
+        hub = QuoteHub(lambda symbol: None, interval=60)
+        subscriber = QuoteSubscriber()
+        hub.subscribe(subscriber, ["AAPL", "MSFT"])
+        hub.publish("AAPL", {"price": 1.0, "volume": 5})
+        hub.publish("AAPL", {"price": 2.0, "volume": 5})
+        hub.publish("MSFT", {"price": 3.0})
+        updates = await asyncio.wait_for(subscriber.next_updates(), timeout=1)
+        await hub.stop()
+        return updates
+
+    assert asyncio.run(scenario()) == {"AAPL": {"price": 2.0, "volume": 5}, "MSFT": {"price": 3.0}}
+
+
+def test_replies_and_updates_share_one_send_queue():
+    async def scenario():
+        hub = QuoteHub(lambda symbol: None, interval=60)
+        subscriber = QuoteSubscriber()
+        hub.subscribe(subscriber, ["TSM"])
+        subscriber.reply({"type": "subscribed", "symbols": ["TSM"]})
+        hub.publish("TSM", {"price": 1.0})
+        messages = await asyncio.wait_for(subscriber.next_messages(), timeout=1)
+        await hub.stop()
+        return messages
+
+    assert asyncio.run(scenario()) == [{"type": "subscribed", "symbols": ["TSM"]},
+                                       {"type": "quotes", "quotes": {"TSM": {"price": 1.0}}}]
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from utils.cache import TTLCache
+from utils.scheduler import PrewarmConfig, PrewarmScheduler, cache_refresh_job
+
+
+def test_next_run_skips_to_next_trading_day():
+    scheduler = PrewarmScheduler("test", PrewarmConfig(brief_time="08:00", lead_minutes=10))
+    # Friday after the window -> Monday 07:50
+    assert scheduler.next_run(datetime(2025, 5, 30, 9, 0)) == datetime(2025, 6, 2, 7, 50)
+    # Monday before the window -> same day
+    assert scheduler.next_run(datetime(2025, 6, 2, 6, 0)) == datetime(2025, 6, 2, 7, 50)
+
+
+def test_status_reports_cold_then_warm_and_failures():
+    scheduler = PrewarmScheduler("test", PrewarmConfig(concurrency=2))
+    scheduler.add_job("quotes", "TSM", lambda: {"price": 1.0})
+    scheduler.add_job("quotes", "AAPL", lambda: {"price": 2.0})
+    scheduler.add_job("yields", "all", lambda: None)
+    assert scheduler.status()["datasets"]["quotes"]["status"] == "cold"
+
+    asyncio.run(scheduler.run_once(jitter=0))
+    datasets = scheduler.status()["datasets"]
+    assert datasets["quotes"]["status"] == "warm"
+    assert datasets["yields"]["status"] == "cold"
+    assert datasets["yields"]["failed_keys"] == ["all"]
+
+
+def test_cache_refresh_job_fails_when_nothing_new_was_cached():
+    cache = TTLCache(timedelta(minutes=15))
+    cache.set(("earnings", "TSM"), {"surprise_percentage": 4.0})  # stale entry from earlier
+    time.sleep(0.01)
+    failed = cache_refresh_job(cache, [("earnings", "TSM")], lambda: [])
+    assert failed() is None
+
+    refreshed = cache_refresh_job(cache, [("earnings", "TSM")],
+                                  lambda: cache.set(("earnings", "TSM"), None))
+    assert refreshed() is True
+
+
+def test_shared_status_is_reported_by_every_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_SHARED_STATE_DIR", str(tmp_path))
+    leader, follower = (PrewarmScheduler("api_agent", PrewarmConfig()) for _ in range(2))
+    for scheduler in (leader, follower):
+        scheduler.add_job("quotes", "TSM", lambda: {"price": 1.0})
+        scheduler.add_job("yields", "all", lambda: None)
+
+    asyncio.run(leader.run_once(jitter=0))
+    status = follower.status()
+    assert status["datasets"]["quotes"]["status"] == "warm"
+    assert status["datasets"]["yields"]["failed_keys"] == ["all"]
+    assert status["last_run"] is not None
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+from data_ingestion.scraper import FinancialScraper, index_region
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures")
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+class RecordingScraper(FinancialScraper):
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+        self.requests = []
+        self.in_flight = self.peak = 0
+        self._lock = threading.Lock()
+
+    def _make_request(self, url, stage="scraper.fetch"):
+        with self._lock:
+            self.requests.append(url)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return _fixture("world_indices.html" if url.endswith("/world-indices") else "financials.html")
+
+
+def test_index_region():
+    assert index_region("Nikkei 225") == "Asia"
+    assert index_region("S&P/ASX 200") == "Asia"
+    assert index_region("S&P 500") == "Americas"
+    assert index_region("Euro Stoxx 50") == "Europe"
+    assert index_region("DAX PERFORMANCE-INDEX") == "Europe"
+    assert index_region("FTSE Bursa Malaysia KLCI") == "Asia"
+    assert index_region("S&P/NZX 50 INDEX GROSS") == "Asia"
+    assert index_region("IDX COMPOSITE") == "Asia"
+    assert index_region("Top 40 USD Net TRI Index") == "Middle East & Africa"
+    assert index_region("SMI PR") == "Europe" and index_region("AEX-Index") == "Europe"
+    assert index_region("SMIC Semiconductor") is None and index_region("AEXY Index") is None
+    assert index_region("Some Index", symbol="^klse") == "Asia"
+    assert index_region("Unknown Index") is None
+
+
+def test_emea_covers_europe_and_middle_east_africa():
+    scraper = RecordingScraper()
+    scraper._parse_world_indices = lambda html: [
+        {"name": "FTSE 100", "change": "+0.1%", "region": "Europe"},
+        {"name": "TA-125", "change": "-0.2%", "region": "Middle East & Africa"},
+        {"name": "CBOE Volatility Index", "change": "+1.0%", "region": None},
+    ]
+    sentiments = scraper.get_market_sentiments(["EMEA", "Europe", "Global"])
+    names = {region: [i["name"] for i in s["indicators"]] for region, s in sentiments.items()}
+    assert names == {"EMEA": ["FTSE 100", "TA-125"], "Europe": ["FTSE 100"],
+                     "Global": ["FTSE 100", "TA-125", "CBOE Volatility Index"]}
+
+
+def test_sentiment_batch_scrapes_world_indices_once_and_splits_by_region():
+    scraper = RecordingScraper()
+    sentiments = scraper.get_market_sentiments(["Asia", "US", "Europe", "Global"])
+    again = scraper.get_market_sentiment("Europe")
+
+    assert len(scraper.requests) == 1
+    names = {region: [i["name"] for i in s["indicators"]] for region, s in sentiments.items()}
+    assert "Nikkei 225" in names["Asia"] and "S&P 500" not in names["Asia"]
+    assert names["US"][0] == "S&P 500" and "FTSE 100" in names["Europe"]
+    assert len(names["Global"]) == sum(len(names[r]) for r in ("Asia", "US", "Europe"))
+    assert again["indicators"] == sentiments["Europe"]["indicators"]
+
+
+def test_filings_batch_fetches_distinct_pages_concurrently_with_bound(monkeypatch):
+    monkeypatch.setenv("SCRAPER_CONCURRENCY", "2")
+    scraper = RecordingScraper(delay=0.05)
+    symbols = ["TSM", "AAPL", "TSM", "MSFT", "NVDA", "GOOGL"]
+    filings = scraper.get_company_filings_batch(symbols)
+
+    assert sorted(filings) == ["AAPL", "GOOGL", "MSFT", "NVDA", "TSM"]
+    assert len(scraper.requests) == 5 and scraper.peak == 2
+    assert all(filings[s] == filings["TSM"] for s in filings) and filings["TSM"]
+    scraper.get_company_filings_batch(["TSM", "AAPL"])
+    assert len(scraper.requests) == 5
@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from data_ingestion.shared_index import MappedIndex
+from utils.cache import MISS, SharedTTLCache, TTLCache
+from utils.file_lock import FileLock
+
+
+def test_shared_cache_is_visible_to_other_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = SharedTTLCache(timedelta(minutes=15), path, "api_agent")
+    reader = SharedTTLCache(timedelta(minutes=15), path, "api_agent")
+    other = SharedTTLCache(timedelta(minutes=15), path, "scraping_agent")
+    writer.set(("quote", "TSM"), {"price": 180.5})
+    writer.set(("earnings", "TSM"), None)
+    assert reader.get(("quote", "TSM")) == {"price": 180.5}
+    assert reader.get(("earnings", "TSM")) is None
+    assert other.get(("quote", "TSM")) is MISS
+    assert reader.age(("quote", "TSM")) < timedelta(seconds=5) and len(reader) == 2
+
+
+def test_ttl_cache_drops_expired_entries():
+    cache = TTLCache(timedelta(milliseconds=100))
+    for i in range(255):
+        cache.set(("quote", f"SYM{i}"), i)
+    time.sleep(0.21)
+    assert len(cache) == 0 and cache.age(("quote", "SYM0")) is not None
+    assert cache.get(("quote", "SYM0")) is MISS and cache.age(("quote", "SYM0")) is None
+    cache.set(("quote", "TSM"), 1)  # 256th write sweeps the rest
+    assert len(cache._entries) == 1 and cache.get(("quote", "TSM")) == 1
+
+
+def test_mapped_index_shares_appends_and_recovers_partial_writes(tmp_path):
+    root = str(tmp_path / "retriever")
+    writer, reader = MappedIndex(root, 4), MappedIndex(root, 4)
+    vectors = np.eye(4, dtype=np.float32)
+    writer.append([{"text": "a", "metadata": {}}, {"text": "b", "metadata": {"k": 1}}], vectors[:2])
+    assert reader.refresh() == (0, 2)
+    assert reader[1].text == "b" and reader[1].metadata == {"k": 1}
+
+    # A writer that died mid-append leaves bytes past the committed rows
+    with open(os.path.join(root, "vectors.f32"), "ab") as f:
+        f.write(b"\xff" * 7)
+    with open(os.path.join(root, "documents.jsonl"), "ab") as f:
+        f.write(b"{" * 500)  # longer than the next batch, so it is not fully overwritten
+    writer.append([{"text": "c", "metadata": {}}], vectors[2:3])
+    assert reader.refresh() == (2, 3)
+    distances, ids = reader.search(vectors[2], top_k=2)
+    assert ids[0] == 2 and distances[0] == 0.0
+    assert reader[2].text == "c"
+    writer.append([{"text": "d", "metadata": {}}], vectors[3:4])
+    assert reader.refresh() == (3, 4) and reader[3].text == "d"
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    with FileLock(path):
+        assert not FileLock(path).acquire(blocking=False)
+    second = FileLock(path)
+    assert second.acquire(blocking=False)
+    second.release()
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+PRIORITY_HEADER = "X-Priority"
+# Lower value is served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+# Long-lived or liveness endpoints that must never queue behind real work
+EXEMPT_PATHS = ("/health", "/metrics", "/events", "/admission")
+
+_priority: ContextVar[str] = ContextVar("priority", default="normal")
+
+
+def get_priority() -> str:
+    return _priority.get()
+
+
+def priority_headers() -> Dict[str, str]:
+    """Headers to forward on outgoing calls so downstream agents keep the request's class."""
+    return {PRIORITY_HEADER: _priority.get()}
+
+
+@contextmanager
+def request_priority(level: str):
+    """Run the enclosed calls (and the downstream requests they make) at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class AdmissionController:
+    """
+    Bounded admission for one agent process: at most `max_concurrent` requests run, and
+    up to `max_queue` wait in priority order (high, normal, low; FIFO within a class).
+    A request that would overflow the queue evicts the lowest-priority waiter if it
+    outranks it, otherwise it is rejected; a waiter that is not admitted within
+    `queue_timeout` seconds gives up. Rejections carry a Retry-After estimated from
+    recent service times, so clients back off instead of piling on.
+    """
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 64, queue_timeout: float = 5.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.shed = {"queue_full": 0, "evicted": 0, "timeout": 0}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._service_time = 0.05  # EWMA of seconds per admitted request
+
+    async def acquire(self, priority: int) -> Optional[str]:
+        """None once admitted, else why the request was shed."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters, default=None)
+            if worst is None or worst[0] <= priority:
+                self.shed["queue_full"] += 1
+                return "queue_full"
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            worst[2].set_result(False)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            admitted = await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            self.shed["timeout"] += 1
+            return "timeout"
+        if not admitted:
+            self.shed["evicted"] += 1
+            return "evicted"
+        return None
+
+    def release(self, elapsed: float):
+        self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(True)  # hand the slot straight to the next waiter
+                return
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        backlog = len(self._waiters) + self.active
+        return max(1, math.ceil(self._service_time * backlog / max(1, self.max_concurrent)))
+
+    def stats(self) -> Dict:
+        return {"active": self.active, "queued": len(self._waiters), "shed": dict(self.shed),
+                "max_concurrent": self.max_concurrent, "max_queue": self.max_queue}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that admits requests through an AdmissionController. The class comes
+    from the X-Priority header (default normal). Shed requests get 429 when the queue is
+    full or they were evicted by higher-priority work, and 503 when they timed out waiting.
+    """
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+        self._header = PRIORITY_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        level = "normal"
+        for key, value in scope.get("headers", []):
+            if key == self._header:
+                level = value.decode("latin-1").strip().lower()
+                break
+        if level not in PRIORITIES:
+            level = "normal"
+
+        reason = await self.controller.acquire(PRIORITIES[level])
+        if reason is not None:
+            response = JSONResponse(
+                {"detail": f"Agent overloaded ({reason}); retry later."},
+                status_code=503 if reason == "timeout" else 429,
+                headers={"Retry-After": str(self.controller.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        token = _priority.set(level)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - start)
+            _priority.reset(token)
+
+
+def add_admission_control(app: FastAPI) -> AdmissionController:
+    """
+    Bound `app`'s concurrency and queue. Call before instrument_app so shed requests
+    still show up in the latency metrics. Limits come from AGENT_MAX_CONCURRENCY (32),
+    AGENT_MAX_QUEUE (64) and AGENT_QUEUE_TIMEOUT seconds (5).
+    """
+    controller = AdmissionController(
+        max_concurrent=int(os.getenv("AGENT_MAX_CONCURRENCY", 32)),
+        max_queue=int(os.getenv("AGENT_MAX_QUEUE", 64)),
+        queue_timeout=float(os.getenv("AGENT_QUEUE_TIMEOUT", 5)),
+    )
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    async def admission_status():
+        return controller.stats()
+
+    app.add_api_route("/admission", admission_status, methods=["GET"], tags=["Utility"])
+    return controller
@@ -0,0 +1,121 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+MISS = object()
+
+
+class TTLCache:
+    """
+    In-process cache whose entries expire after `ttl`. `get` returns MISS rather than
+    None on a miss so that "no data" results can be cached too. Expired entries are kept
+    for one extra TTL, so `age` still reports recent misses, then dropped on `get` or by
+    the sweep `set` runs every few hundred writes.
+    """
+    def __init__(self, ttl: timedelta):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[Any, datetime]] = {}
+        self._sets = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        now = datetime.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] >= 2 * self.ttl:
+                del self._entries[key]
+        if entry is None or now - entry[1] >= self.ttl:
+            return MISS
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        now = datetime.now()
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._sets += 1
+            if self._sets % 256 == 0:
+                self._entries = {k: e for k, e in self._entries.items() if now - e[1] < 2 * self.ttl}
+
+    def age(self, key: Hashable) -> Optional[timedelta]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return datetime.now() - entry[1] if entry else None
+
+    def __len__(self) -> int:
+        """Number of entries that have not expired."""
+        now = datetime.now()
+        with self._lock:
+            return sum(now - stored_at < self.ttl for _, stored_at in self._entries.values())
+
+
+class SharedTTLCache:
+    """
+    TTLCache with the same interface, stored in a SQLite file so every worker process
+    on the host shares one cache (and one hit rate). Values are pickled; entries of
+    different caches in the same file are kept apart by `namespace`.
+    """
+    def __init__(self, ttl: timedelta, path: str, namespace: str):
+        self.ttl = ttl
+        self.path = path
+        self.namespace = namespace
+        self._local = threading.local()
+        self._sets = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key BLOB, value BLOB, stored_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, key: Hashable) -> Optional[Tuple[bytes, float]]:
+        return self._conn().execute(
+            "SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, pickle.dumps(key)),
+        ).fetchone()
+
+    def get(self, key: Hashable) -> Any:
+        row = self._row(key)
+        if row is None or time.time() - row[1] >= self.ttl.total_seconds():
+            return MISS
+        return pickle.loads(row[0])
+
+    def set(self, key: Hashable, value: Any):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                     (self.namespace, pickle.dumps(key), pickle.dumps(value), now))
+        self._sets += 1
+        if self._sets % 256 == 0:
+            # Keep expired entries for one extra TTL so age() still reports recent misses
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND stored_at < ?",
+                         (self.namespace, now - 2 * self.ttl.total_seconds()))
+
+    def age(self, key: Hashable) -> Optional[timedelta]:
+        row = self._row(key)
+        return timedelta(seconds=time.time() - row[1]) if row else None
+
+    def __len__(self) -> int:
+        """Number of entries that have not expired."""
+        return self._conn().execute("SELECT COUNT(*) FROM cache WHERE namespace = ? AND stored_at >= ?",
+                                    (self.namespace, time.time() - self.ttl.total_seconds())).fetchone()[0]
+
+
+def make_cache(ttl: timedelta, namespace: str):
+    """SharedTTLCache under AGENT_SHARED_STATE_DIR when shared-state mode is on, else TTLCache."""
+    shared_dir = os.getenv("AGENT_SHARED_STATE_DIR")
+    if shared_dir:
+        return SharedTTLCache(ttl, os.path.join(shared_dir, "cache.db"), namespace)
+    return TTLCache(ttl)
@@ -0,0 +1,60 @@
+import os
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on `path`, shared by every process (and thread) that opens
+    the same file: fcntl.flock on POSIX, msvcrt.locking on Windows. The lock is released
+    when the holder exits, so a crashed worker never leaves it stuck.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handle = open(self.path, "a+b")
+        try:
+            if os.name == "nt":
+                handle.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.01)
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError:
+            handle.close()
+            return False
+        self._file = handle
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if os.name == "nt":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
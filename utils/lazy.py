@@ -0,0 +1,34 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access, so agents
+    only pay for libraries such as yfinance, faiss or whisper when an endpoint needs them.
+    To stub a library for every user, patch the real module (`mock.patch("yfinance.Ticker")`).
+    """
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module = None
+        self._lazy_lock = threading.Lock()
+
+    def __getattr__(self, attr: str):
+        return getattr(ensure_loaded(self), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def ensure_loaded(module: LazyModule):
+    """Import the module behind `module` now (if not already) and return it."""
+    if module._lazy_module is None:
+        with module._lazy_lock:
+            if module._lazy_module is None:
+                module._lazy_module = importlib.import_module(module._lazy_name)
+    return module._lazy_module
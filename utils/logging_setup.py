@@ -0,0 +1,137 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict
+
+from utils.metrics import get_trace_id
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s'
+
+_listeners: Dict[str, QueueListener] = {}
+_lock = threading.Lock()
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp each record with the trace ID of the request that produced it."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = get_trace_id() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through one record in every `every` records. Meant for high-frequency,
+    low-value messages such as health checks; warnings and errors always pass.
+    """
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        self._count += 1
+        return (self._count - 1) % self.every == 0
+
+
+class _Summary:
+    """Deferred payload summary; only rendered if the record is actually emitted."""
+    __slots__ = ("payload", "max_items", "max_chars")
+
+    def __init__(self, payload: Any, max_items: int, max_chars: int):
+        self.payload = payload
+        self.max_items = max_items
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        payload = self.payload
+        if isinstance(payload, dict):
+            keys = list(payload)
+            shown = ", ".join(f"{k}={_short(payload[k])}" for k in keys[:self.max_items])
+            more = f", +{len(keys) - self.max_items} more" if len(keys) > self.max_items else ""
+            text = f"dict[{len(keys)}]{{{shown}{more}}}"
+        elif isinstance(payload, (list, tuple)):
+            shown = ", ".join(_short(item) for item in payload[:self.max_items])
+            more = f", +{len(payload) - self.max_items} more" if len(payload) > self.max_items else ""
+            text = f"{type(payload).__name__}[{len(payload)}][{shown}{more}]"
+        else:
+            text = str(payload)
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + "..."
+        return text
+
+
+def _short(value: Any) -> str:
+    if isinstance(value, dict):
+        return f"dict[{len(value)}]"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    text = str(value)
+    return text if len(text) <= 40 else text[:40] + "..."
+
+
+def summarize(payload: Any, max_items: int = 5, max_chars: int = 300) -> _Summary:
+    """Wrap a result payload so logs show its shape rather than a full dump."""
+    return _Summary(payload, max_items, max_chars)
+
+
+def setup_logging(name: str, log_file: str = None) -> logging.Logger:
+    """
+    Configure the `name` logger (and its children) to write through a background queue
+    to a size-rotated file and stderr. Safe to call more than once per process.
+
+    Environment overrides: LOG_LEVEL, LOG_DIR, LOG_MAX_BYTES, LOG_BACKUP_COUNT.
+    """
+    logger = logging.getLogger(name)
+    with _lock:
+        if name in _listeners:
+            return logger
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        log_dir = os.getenv("LOG_DIR", ".")
+        file_handler = RotatingFileHandler(
+            os.path.join(log_dir, log_file or f"{name}.log"),
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", 5 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", 3)),
+            delay=True,
+        )
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(TraceIdFilter())
+
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+
+        listener = QueueListener(log_queue, file_handler, stream_handler)
+        listener.start()
+        _listeners[name] = listener
+    return logger
+
+
+@atexit.register
+def shutdown_logging(name: str = None):
+    """Flush and stop the background writer for `name`, or for every configured logger."""
+    with _lock:
+        names = [name] if name else list(_listeners)
+        for key in names:
+            listener = _listeners.pop(key, None)
+            if listener is not None:
+                listener.stop()
+
+
+def get_sampled_logger(name: str, every: int = None) -> logging.Logger:
+    """Child logger that keeps one in `every` records (LOG_SAMPLE_EVERY, default 100)."""
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        every = every or int(os.getenv("LOG_SAMPLE_EVERY", 100))
+        logger.addFilter(SamplingFilter(every))
+    return logger
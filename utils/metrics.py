@@ -0,0 +1,183 @@
+import bisect
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+TRACE_HEADER = "X-Request-ID"
+
+# Latency buckets in seconds, spanning cache hits up to the orchestrator's 30s timeout
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+
+def get_trace_id() -> Optional[str]:
+    """Return the trace ID of the request currently being handled, if any."""
+    return _trace_id.get()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers to forward on outgoing calls so downstream agents share the trace ID."""
+    trace_id = _trace_id.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+
+class Histogram:
+    """
+    Cumulative latency histogram keyed by label values, rendered in Prometheus text format.
+    Observations are a bisect plus a counter bump under a lock, cheap enough for hot paths.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labelvalues] = series
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _labels(self, labelvalues: Iterable[str], extra: str = "") -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labelvalues)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for labelvalues, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{self._labels(labelvalues, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._labels(labelvalues, le)} {count}")
+            lines.append(f"{self.name}_sum{self._labels(labelvalues)} {total}")
+            lines.append(f"{self.name}_count{self._labels(labelvalues)} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...]) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, labelnames)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "agent_request_duration_seconds",
+    "Latency of HTTP requests handled by an agent, per endpoint.",
+    ("service", "method", "endpoint", "status"),
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "agent_stage_duration_seconds",
+    "Latency of internal stages such as upstream fetches, parsing and index search.",
+    ("stage",),
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Record the wall time of the wrapped block under the given stage name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that adopts (or mints) the request's trace ID, echoes it on the
+    response and records per-endpoint latency. Written against raw ASGI so it adds no
+    buffering to streaming responses.
+    """
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+        self._header = TRACE_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = None
+        for key, value in scope.get("headers", []):
+            if key == self._header:
+                trace_id = value.decode("latin-1")
+                break
+        token = _trace_id.set(trace_id or new_trace_id())
+        status = {"code": 500}
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((self._header, _trace_id.get().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            route = scope.get("route")
+            # Use the route template so path parameters don't explode label cardinality
+            endpoint = getattr(route, "path", None) or "<unmatched>"
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                self.service, scope["method"], endpoint, str(status["code"]),
+            )
+            _trace_id.reset(token)
+
+
+def instrument_app(app: FastAPI, service: str):
+    """Attach tracing middleware and a Prometheus-format /metrics endpoint to an agent."""
+    app.add_middleware(TracingMiddleware, service=service)
+
+    async def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    app.add_api_route("/metrics", metrics, methods=["GET"], tags=["Utility"], include_in_schema=False)
@@ -0,0 +1,122 @@
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+logger = logging.getLogger("rate_limit")
+
+YAHOO_FINANCE = "finance.yahoo.com"
+
+
+class UpstreamThrottled(Exception):
+    """No request token for `host` became available within the caller's wait budget."""
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Rate limit for {host} exhausted; retry in {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def throttled_error(e: UpstreamThrottled) -> HTTPException:
+    """503 with Retry-After for an endpoint whose upstream call was rate limited."""
+    return HTTPException(status_code=503, detail=str(e),
+                         headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second on average with bursts of up to
+    `burst`. `throttle` empties the bucket and pauses it, e.g. when the upstream answers
+    429 with a Retry-After.
+    """
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        """Seconds until a token is available; takes it and returns 0 if one is."""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, max_wait: float = 0.0) -> bool:
+        """Take a token, sleeping up to `max_wait` seconds for one; False if none came."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+            if wait == 0.0:
+                return True
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def retry_after(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            return max(0.0, (1 - tokens) / self.rate)
+
+    def throttle(self, seconds: float):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """"host=rate:burst,host=rate:burst" -> {host: (rate, burst)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[host.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class UpstreamLimits:
+    """
+    One TokenBucket per upstream host, shared by every fetcher and scraper in the process.
+    Configure with UPSTREAM_RATE_LIMITS="finance.yahoo.com=5:10,www.marketwatch.com=2:4"
+    (requests per second : burst). Hosts without an entry get UPSTREAM_RATE / UPSTREAM_BURST.
+    """
+    def __init__(self):
+        self.default = (float(os.getenv("UPSTREAM_RATE", 5)), float(os.getenv("UPSTREAM_BURST", 10)))
+        self.max_wait = float(os.getenv("UPSTREAM_MAX_WAIT", 0.5))
+        self._limits = _parse_limits(os.getenv("UPSTREAM_RATE_LIMITS", ""))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(*self._limits.get(host, self.default))
+            return bucket
+
+    def acquire(self, host: str, max_wait: Optional[float] = None):
+        """Take a request token for `host` or raise UpstreamThrottled without calling it."""
+        bucket = self.bucket(host)
+        if not bucket.acquire(self.max_wait if max_wait is None else max_wait):
+            raise UpstreamThrottled(host, bucket.retry_after())
+
+    def throttle(self, host: str, seconds: float):
+        logger.warning("Upstream %s is throttling us; pausing requests for %.0fs.", host, seconds)
+        self.bucket(host).throttle(seconds)
+
+
+UPSTREAM_LIMITS = UpstreamLimits()
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+from contextlib import closing
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from utils.file_lock import FileLock
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+class PrewarmConfig(BaseModel):
+    """Watchlist and schedule for warming agent caches ahead of the morning brief."""
+    enabled: bool = True
+    watchlist: List[str] = ["TSM", "005930.KS", "9988.HK", "6758.T", "AAPL", "MSFT", "NVDA", "GOOGL"]
+    regions: List[str] = ["Asia", "US", "Europe"]
+    brief_time: str = "08:00"
+    days: List[str] = ["mon", "tue", "wed", "thu", "fri"]
+    lead_minutes: int = 10
+    jitter_seconds: float = 60.0
+    concurrency: int = 4
+    max_age_minutes: int = 15
+
+    @classmethod
+    def from_env(cls) -> "PrewarmConfig":
+        """Build from PREWARM_* environment variables, falling back to the defaults above."""
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("PREWARM_ENABLED", "true").lower() in ("1", "true", "yes"),
+            watchlist=_env_list("PREWARM_WATCHLIST", ",".join(defaults.watchlist)),
+            regions=_env_list("PREWARM_REGIONS", ",".join(defaults.regions)),
+            brief_time=os.getenv("PREWARM_BRIEF_TIME", defaults.brief_time),
+            days=[d.lower()[:3] for d in _env_list("PREWARM_DAYS", ",".join(defaults.days))],
+            lead_minutes=int(os.getenv("PREWARM_LEAD_MINUTES", defaults.lead_minutes)),
+            jitter_seconds=float(os.getenv("PREWARM_JITTER_SECONDS", defaults.jitter_seconds)),
+            concurrency=int(os.getenv("PREWARM_CONCURRENCY", defaults.concurrency)),
+            max_age_minutes=int(os.getenv("PREWARM_MAX_AGE_MINUTES", defaults.max_age_minutes)),
+        )
+
+
+def cache_refresh_job(cache, cache_keys: List[Tuple], load: Callable[[], Any]) -> Callable[[], Optional[bool]]:
+    """
+    Wrap a refresh call whose fetchers swallow upstream errors, so it only counts as
+    refreshed if every key in `cache_keys` was written to `cache` during this call.
+    """
+    def job():
+        started = datetime.now()
+        load()
+        for key in cache_keys:
+            age = cache.age(key)
+            if age is None or datetime.now() - age < started:
+                return None
+        return True
+    return job
+
+
+class _JobState:
+    __slots__ = ("last_refreshed", "last_error", "duration")
+
+    def __init__(self):
+        self.last_refreshed: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+
+class PrewarmScheduler:
+    """
+    Refreshes registered datasets shortly before the configured brief time on trading days.
+    Each job is a blocking callable run in a worker thread; jobs start with random jitter
+    and at most `config.concurrency` run at once. A job that raises or returns None counts
+    as a failed refresh.
+
+    With AGENT_SHARED_STATE_DIR set, the agent's workers share one cache, so only the
+    worker holding the `<name>.prewarm.lock` file lock runs the schedule. Job results are
+    then recorded in `<name>.prewarm.db` there, so every worker reports the same status
+    whichever one ran the refresh.
+    """
+    def __init__(self, name: str, config: PrewarmConfig):
+        self.name = name
+        self.config = config
+        self.logger = logging.getLogger(f"{name}.prewarm")
+        self._jobs: Dict[Tuple[str, str], Callable[[], Any]] = {}
+        self._state: Dict[Tuple[str, str], _JobState] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._leader_lock: Optional[FileLock] = None
+        self.last_run: Optional[datetime] = None
+        shared_dir = os.getenv("AGENT_SHARED_STATE_DIR")
+        self._state_path = os.path.join(shared_dir, f"{name}.prewarm.db") if shared_dir else None
+
+    def _shared_state(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._state_path), exist_ok=True)
+        conn = sqlite3.connect(self._state_path, timeout=10, isolation_level=None)
+        conn.execute("CREATE TABLE IF NOT EXISTS jobs (dataset TEXT, key TEXT, last_refreshed TEXT, "
+                     "last_error TEXT, duration REAL, PRIMARY KEY (dataset, key))")
+        conn.execute("CREATE TABLE IF NOT EXISTS runs (name TEXT PRIMARY KEY, last_run TEXT)")
+        return conn
+
+    def _save_state(self, job_key: Tuple[str, str], state: "_JobState"):
+        if self._state_path is None:
+            return
+        refreshed = state.last_refreshed.isoformat() if state.last_refreshed else None
+        with closing(self._shared_state()) as conn:
+            conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)",
+                         (*job_key, refreshed, state.last_error, state.duration))
+
+    def _load_state(self):
+        """Adopt the latest job results recorded by any worker, this one included."""
+        if self._state_path is None:
+            return
+        with closing(self._shared_state()) as conn:
+            rows = conn.execute("SELECT * FROM jobs").fetchall()
+            run = conn.execute("SELECT last_run FROM runs WHERE name = 'all'").fetchone()
+        for dataset, key, refreshed, error, duration in rows:
+            state = self._state.get((dataset, key))
+            if state is None:
+                continue
+            state.last_refreshed = datetime.fromisoformat(refreshed) if refreshed else None
+            state.last_error = error
+            state.duration = duration
+        if run:
+            self.last_run = max(filter(None, (self.last_run, datetime.fromisoformat(run[0]))))
+
+    def add_job(self, dataset: str, key: str, refresh: Callable[[], Any]):
+        self._jobs[(dataset, key)] = refresh
+        self._state[(dataset, key)] = _JobState()
+
+    def next_run(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Start of the next pre-warm window: brief time minus lead on the next trading day."""
+        now = now or datetime.now()
+        hour, minute = (int(part) for part in self.config.brief_time.split(":"))
+        days = {WEEKDAYS.index(day) for day in self.config.days if day in WEEKDAYS}
+        for offset in range(8):
+            day = (now + timedelta(days=offset)).date()
+            if day.weekday() not in days:
+                continue
+            run_at = datetime.combine(day, time(hour, minute)) - timedelta(minutes=self.config.lead_minutes)
+            if run_at > now:
+                return run_at
+        return None
+
+    async def _run_job(self, job_key: Tuple[str, str], semaphore: asyncio.Semaphore, jitter: float):
+        await asyncio.sleep(random.uniform(0, jitter))
+        state = self._state[job_key]
+        async with semaphore:
+            started = datetime.now()
+            try:
+                result = await asyncio.to_thread(self._jobs[job_key])
+                if result is None:
+                    raise RuntimeError("refresh returned no data")
+                state.last_refreshed = datetime.now()
+                state.last_error = None
+            except Exception as e:
+                state.last_error = str(e)
+                self.logger.warning("Pre-warm of %s/%s failed: %s", job_key[0], job_key[1], e)
+            state.duration = (datetime.now() - started).total_seconds()
+            await asyncio.to_thread(self._save_state, job_key, state)
+
+    async def run_once(self, jitter: Optional[float] = None):
+        """Refresh every registered dataset now."""
+        jitter = self.config.jitter_seconds if jitter is None else jitter
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        await asyncio.gather(*(self._run_job(key, semaphore, jitter) for key in self._jobs))
+        self.last_run = datetime.now()
+        if self._state_path is not None:
+            with closing(self._shared_state()) as conn:
+                conn.execute("INSERT OR REPLACE INTO runs VALUES ('all', ?)", (self.last_run.isoformat(),))
+        self.logger.info("Pre-warm run finished for %s jobs.", len(self._jobs))
+
+    async def _loop(self):
+        while True:
+            run_at = self.next_run()
+            if run_at is None:
+                self.logger.warning("No pre-warm days configured; scheduler idle.")
+                return
+            await asyncio.sleep((run_at - datetime.now()).total_seconds())
+            await self.run_once()
+
+    def start(self):
+        if self._task is not None or not self._jobs:
+            return
+        shared_dir = os.getenv("AGENT_SHARED_STATE_DIR")
+        if shared_dir and self._leader_lock is None:
+            lock = FileLock(os.path.join(shared_dir, f"{self.name}.prewarm.lock"))
+            if not lock.acquire(blocking=False):
+                self.logger.info("Another worker runs the pre-warm schedule.")
+                return
+            self._leader_lock = lock
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._leader_lock is not None:
+            self._leader_lock.release()
+            self._leader_lock = None
+
+    def status(self) -> Dict:
+        """Freshness per dataset: warm if every key was refreshed within max_age, else stale or cold."""
+        self._load_state()
+        now = datetime.now()
+        max_age = timedelta(minutes=self.config.max_age_minutes)
+        datasets: Dict[str, Dict] = {}
+        for (dataset, key), state in self._state.items():
+            entry = datasets.setdefault(dataset, {"keys": 0, "warm_keys": 0, "oldest_refresh": None,
+                                                  "failed_keys": []})
+            entry["keys"] += 1
+            if state.last_error:
+                entry["failed_keys"].append(key)
+            if state.last_refreshed is None:
+                entry["oldest_refresh"] = "never"
+                continue
+            if now - state.last_refreshed < max_age:
+                entry["warm_keys"] += 1
+            if entry["oldest_refresh"] != "never" and (
+                    entry["oldest_refresh"] is None or state.last_refreshed < entry["oldest_refresh"]):
+                entry["oldest_refresh"] = state.last_refreshed
+        for entry in datasets.values():
+            if entry["warm_keys"] == entry["keys"]:
+                entry["status"] = "warm"
+            elif entry["oldest_refresh"] == "never" and entry["warm_keys"] == 0:
+                entry["status"] = "cold"
+            else:
+                entry["status"] = "stale"
+            if isinstance(entry["oldest_refresh"], datetime):
+                entry["oldest_refresh"] = entry["oldest_refresh"].isoformat()
+        next_run = self.next_run(now)
+        return {
+            "enabled": self.config.enabled,
+            "next_run": next_run.isoformat() if next_run else None,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "datasets": datasets,
+        }
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+from fastapi import FastAPI
+
+
+def add_warmup(app: FastAPI, logger: logging.Logger, steps: Dict[str, Callable[[], object]]):
+    """
+    Give `app` an explicit warm-up for the heavy dependencies it defers: `POST /warmup`
+    runs `steps` once and returns how long each took. With AGENT_WARMUP=true they also
+    run in a background thread at startup, so /health answers before warm-up finishes.
+    """
+    state = {"status": "cold", "steps": {}}
+    lock = threading.Lock()
+
+    def run() -> Dict:
+        with lock:
+            if state["status"] == "warm":
+                return state
+            for name, step in steps.items():
+                began = time.perf_counter()
+                try:
+                    step()
+                    state["steps"][name] = round(time.perf_counter() - began, 3)
+                except Exception as e:
+                    logger.warning("Warm-up step %s failed: %s", name, e)
+                    state["steps"][name] = f"failed: {e}"
+            failed = any(isinstance(result, str) for result in state["steps"].values())
+            # Failed steps are retried on the next call
+            state["status"] = "partial" if failed else "warm"
+            logger.info("Warm-up finished: %s", state["steps"])
+        return state
+
+    @app.post("/warmup", tags=["Utility"])
+    async def warmup():
+        """Load deferred dependencies now instead of on the first request that needs them."""
+        return await asyncio.to_thread(run)
+
+    @app.on_event("startup")
+    async def warmup_on_startup():
+        if os.getenv("AGENT_WARMUP", "false").lower() in ("1", "true", "yes"):
+            app.state.warmup_task = asyncio.create_task(asyncio.to_thread(run))